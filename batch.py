@@ -0,0 +1,319 @@
+"""
+batch.py
+
+A command-line tool for converting whole osu! Songs folders to Clone Hero charts.
+
+Usage: python batch.py <songs directory> <output directory> [options]
+"""
+
+import argparse
+import os
+import sys
+import time
+from os.path import basename, exists, join
+
+from osu import Osu
+from chart import Chart
+
+# Worker processes import this module again on platforms that spawn them (Windows and macOS), so the modules
+# of optional features (--cache, --index, --package, --verify and --profile) are only imported once they are used
+
+DIFFICULTIES = ("easy", "medium", "hard", "expert")
+
+# The ConversionCache of a worker process, if --cache is used
+_cache = None
+
+def _init_worker(cache_dir, cache_size):
+    global _cache
+
+    if cache_dir is not None:
+        from cache import ConversionCache
+
+        _cache = ConversionCache(cache_dir, cache_size)
+
+# Returns a list of (set directory, [.osu paths]) for every beatmap set under songs_dir.
+# A beatmap set is any directory that directly contains at least one .osu file
+def find_beatmap_sets(songs_dir):
+    beatmap_sets = []
+
+    for directory, subdirectories, files in os.walk(songs_dir):
+        subdirectories.sort()
+        osu_fnames = sorted(join(directory, f) for f in files if f[-4:] == ".osu")
+
+        if len(osu_fnames) > 0:
+            beatmap_sets.append((directory, osu_fnames))
+
+    return beatmap_sets
+
+# Returns a dict of difficulty name -> OsuFile for a list of parsed osu!mania difficulties.
+# Difficulties are ranked by their number of hit objects, the densest one always becomes Expert
+# and any difficulties beyond the four available slots are dropped from the easy end
+def assign_difficulties(osu_files):
+    ranked = sorted(osu_files, key=lambda f: (len(f.hit_objects), f.overall_difficulty))[-len(DIFFICULTIES):]
+
+    difficulties = dict.fromkeys(DIFFICULTIES)
+    for name, osu_file in zip(DIFFICULTIES[len(DIFFICULTIES) - len(ranked):], ranked):
+        difficulties[name] = osu_file
+
+    return difficulties
+
+# Converts a single beatmap set into <out_dir>/<set name>/notes.chart
+# Runs inside a worker process, so every error is caught and reported back instead of raised
+# Returns a (set_dir, status, message, records) tuple where status is "converted", "mismatched", "skipped" or "failed"
+# and records are the StageProfiler records of the conversion, if options["profile"] is set
+def convert_set(set_dir, osu_fnames, out_dir, options):
+    if options["profile"] is None:
+        return _convert_set(set_dir, osu_fnames, out_dir, options, None) + ([],)
+
+    from profiling import StageProfiler
+
+    profiler = StageProfiler(options["profile_allocations"])
+
+    if options["pstats_dir"] is None:
+        return _convert_set(set_dir, osu_fnames, out_dir, options, profiler) + (profiler.records,)
+
+    # Every set is profiled separately, main() merges the stats of all sets
+    import cProfile
+
+    profile = cProfile.Profile()
+    result = profile.runcall(_convert_set, set_dir, osu_fnames, out_dir, options, profiler)
+    profile.dump_stats(join(options["pstats_dir"], f"{os.getpid()}-{time.perf_counter_ns()}.pstats"))
+
+    return result + (profiler.records,)
+
+def _convert_set(set_dir, osu_fnames, out_dir, options, profiler):
+    try:
+        chart_dir = join(out_dir, basename(set_dir.rstrip("/\\")))
+        chart_fname = join(chart_dir, "notes.chart")
+
+        if exists(chart_fname) and not options["overwrite"]:
+            return (set_dir, "skipped", "notes.chart already exists")
+
+        load_osu = Osu.create_from_path if _cache is None else _cache.load_osu
+        create_chart = Chart.create_from_osu if _cache is None else _cache.create_chart
+
+        osu_files = []
+        for fname in osu_fnames:
+            if profiler is None:
+                osu_file = load_osu(fname)
+            else:
+                with profiler.stage("parse", fname) as record:
+                    osu_file = load_osu(fname)
+                    if osu_file is not None:
+                        record["hit_objects"] = len(osu_file.hit_objects)
+                        record["timing_points"] = len(osu_file.timing_points)
+
+            if osu_file is not None:
+                osu_files.append(osu_file)
+
+        if len(osu_files) == 0:
+            return (set_dir, "skipped", "no osu!mania difficulties")
+
+        difficulties = assign_difficulties(osu_files)
+
+        # Same as the GUI, the easiest available difficulty provides the metadata and SyncTrack
+        source_osu_file = next(difficulties[d] for d in DIFFICULTIES if difficulties[d] is not None)
+
+        create_set_chart = lambda: create_chart(source_osu_file,
+            resolution=options["resolution"],
+            preview_length=options["preview_length"],
+            use_unicode_metadata=options["use_unicode_metadata"],
+            use_tags_as_genre=options["use_tags_as_genre"],
+            expert=difficulties["expert"],
+            hard=difficulties["hard"],
+            medium=difficulties["medium"],
+            easy=difficulties["easy"],
+            profiler=profiler,
+            exact_timing=options["exact_timing"],
+            snap=options["snap"])
+
+        if options["package"]:
+            from package import export_package
+
+            # The media is copied while the chart is generated, so the "package" stage includes the chart stages
+            if profiler is None:
+                export_package(create_set_chart, source_osu_file, set_dir, chart_dir, options["include_background"], options["hardlink"])
+            else:
+                with profiler.stage("package", chart_dir):
+                    export_package(create_set_chart, source_osu_file, set_dir, chart_dir, options["include_background"], options["hardlink"])
+        else:
+            chart = create_set_chart()
+
+            os.makedirs(chart_dir, exist_ok=True)
+            if profiler is None:
+                chart.export(chart_fname)
+            else:
+                with profiler.stage("export", chart_fname):
+                    chart.export(chart_fname)
+
+        if options["verify"]:
+            if profiler is None:
+                problems = verify_set(chart_fname, difficulties)
+            else:
+                with profiler.stage("verify", chart_fname):
+                    problems = verify_set(chart_fname, difficulties)
+
+            if problems is not None:
+                return (set_dir, "mismatched", problems)
+
+        return (set_dir, "converted", f"{len(osu_files)} difficulties")
+    except Exception:
+        import traceback
+
+        return (set_dir, "failed", traceback.format_exc().strip().splitlines()[-1])
+
+# Reads back an exported notes.chart and compares it with the difficulties it was converted from
+# Returns a summary of the off-grid, drifted and unmatched notes, or None if there are none
+def verify_set(chart_fname, difficulties):
+    from verify import verify_chart, summarize
+
+    chart_file = Chart.create_from_path(chart_fname)
+    if chart_file is None:
+        return "could not read notes.chart"
+
+    return summarize(verify_chart(chart_file, {d.capitalize(): osu_file for d, osu_file in difficulties.items()}))
+
+def print_profile_summary(profiler):
+    print("  stage          count    wall (s)     cpu (s)")
+    for stage, total in profiler.summary().items():
+        print(f"  {stage:<12} {total['count']:7d} {total['wall_seconds']:11.3f} {total['cpu_seconds']:11.3f}")
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Convert every osu!mania beatmap set in an osu! Songs folder to Clone Hero charts.")
+    parser.add_argument("songs_dir", help="osu! Songs directory (or any directory containing beatmap set folders)")
+    parser.add_argument("out_dir", help="directory to write the converted song folders to")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="number of worker processes (default: CPU count)")
+    parser.add_argument("-r", "--resolution", type=int, default=96, help="chart resolution (default: 96)")
+    parser.add_argument("-p", "--preview-length", type=float, default=0.0, help="preview length in seconds (default: 0)")
+    parser.add_argument("--exact-timing", action="store_true", help="place every note from the tick of its own timing point, so rounding errors stay within each timing point instead of adding up over long maps (see README)")
+    parser.add_argument("--snap", type=int, metavar="N", help="snap notes to 1/N notes from their timing point, e.g. 192 (requires --exact-timing, default: every 2 ticks)")
+    parser.add_argument("--unicode", action="store_true", help="use unicode metadata")
+    parser.add_argument("--tags-as-genre", action="store_true", help="use tags as genre")
+    parser.add_argument("--overwrite", action="store_true", help="overwrite existing notes.chart files")
+    parser.add_argument("--package", action="store_true", help="write complete song folders with song.ini and the audio, instead of only notes.chart")
+    parser.add_argument("--include-background", action="store_true", help="also copy the background and video into song folders (requires --package)")
+    parser.add_argument("--hardlink", action="store_true", help="hardlink the media into song folders instead of copying it, when on the same drive (requires --package)")
+    parser.add_argument("--verify", action="store_true", help="read back every notes.chart and report notes that are off the beat grid or drifted from their .osu hit objects")
+    parser.add_argument("--cache", metavar="DIR", help="cache parsed .osu files and generated tracks in DIR, so unchanged difficulties are not converted again")
+    parser.add_argument("--cache-size", type=int, default=1024, metavar="MB", help="maximum size of the cache in MB (default: 1024)")
+    parser.add_argument("--index", metavar="DB", help="find the osu!mania beatmap sets with a library.py index in DB, which is updated first, instead of parsing every .osu file")
+    parser.add_argument("-k", "--keys", type=int, help="only convert difficulties with this key count (requires --index)")
+    parser.add_argument("--profile", metavar="FILE", help="record the time spent in every conversion stage and write it to FILE as JSON, or as cProfile stats if FILE ends with .pstats or .prof")
+    parser.add_argument("--profile-allocations", action="store_true", help="also record the memory allocated by every stage (slow)")
+
+    args = parser.parse_args(argv)
+
+    if args.workers <= 0:
+        parser.error("--workers must be greater than 0")
+    if args.resolution <= 0:
+        parser.error("--resolution must be greater than 0")
+    if args.preview_length < 0:
+        parser.error("--preview-length cannot be a negative number")
+    if args.snap is not None and not args.exact_timing:
+        parser.error("--snap requires --exact-timing")
+    if args.snap is not None and args.snap <= 0:
+        parser.error("--snap must be greater than 0")
+    if (args.include_background or args.hardlink) and not args.package:
+        parser.error("--include-background and --hardlink require --package")
+    if args.keys is not None and args.index is None:
+        parser.error("--keys requires --index")
+
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    options = {
+        "resolution": args.resolution,
+        "preview_length": args.preview_length,
+        "exact_timing": args.exact_timing,
+        "snap": args.snap,
+        "use_unicode_metadata": args.unicode,
+        "use_tags_as_genre": args.tags_as_genre,
+        "overwrite": args.overwrite,
+        "package": args.package,
+        "include_background": args.include_background,
+        "hardlink": args.hardlink,
+        "verify": args.verify,
+        "profile": args.profile,
+        "profile_allocations": args.profile_allocations,
+        "pstats_dir": None
+    }
+
+    profiler = None
+    if args.profile is not None:
+        from profiling import StageProfiler, is_pstats_fname
+
+        profiler = StageProfiler()
+        if is_pstats_fname(args.profile):
+            import tempfile
+
+            pstats_dir = tempfile.TemporaryDirectory()
+            options["pstats_dir"] = pstats_dir.name
+
+    if args.index is not None:
+        from library import LibraryIndex
+
+        index = LibraryIndex(args.index)
+        index.scan(args.songs_dir)
+        beatmap_sets = index.find_sets(args.keys, songs_dir=args.songs_dir)
+        index.close()
+    else:
+        beatmap_sets = find_beatmap_sets(args.songs_dir)
+    results = {"converted": [], "mismatched": [], "skipped": [], "failed": []}
+
+    start_time = time.perf_counter()
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.cache, args.cache_size * 1024 * 1024)) as executor:
+        futures = {executor.submit(convert_set, set_dir, osu_fnames, args.out_dir, options): set_dir for set_dir, osu_fnames in beatmap_sets}
+
+        for future in as_completed(futures):
+            # convert_set never raises, but a worker process can still die underneath it
+            try:
+                set_dir, status, message, records = future.result()
+            except Exception as e:
+                set_dir, status, message, records = futures[future], "failed", repr(e), []
+
+            results[status].append((set_dir, message))
+            for record in records:
+                profiler.add_record(record)
+
+            if status == "failed":
+                print(f"FAILED  {set_dir}: {message}", file=sys.stderr)
+            elif status == "mismatched":
+                print(f"MISMATCH  {set_dir}: {message}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start_time
+    throughput = len(beatmap_sets) / elapsed if elapsed > 0 else 0.0
+
+    print(f"{len(beatmap_sets)} beatmap sets in {elapsed:.2f}s ({throughput:.2f} sets/sec, {args.workers} workers)")
+    print(f"  converted: {len(results['converted'])}")
+    if args.verify:
+        print(f"  mismatched: {len(results['mismatched'])}")
+    print(f"  skipped:   {len(results['skipped'])}")
+    print(f"  failed:    {len(results['failed'])}")
+
+    for set_dir, message in sorted(results["failed"]):
+        print(f"    {set_dir}: {message}")
+
+    if args.profile is not None:
+        print_profile_summary(profiler)
+
+        if options["pstats_dir"] is not None:
+            import pstats
+
+            pstats_fnames = [join(options["pstats_dir"], f) for f in sorted(os.listdir(options["pstats_dir"]))]
+            if len(pstats_fnames) > 0:
+                pstats.Stats(*pstats_fnames).dump_stats(args.profile)
+            pstats_dir.cleanup()
+        else:
+            profiler.dump_json(args.profile)
+
+        print(f"Wrote profile to {args.profile}")
+
+    return 1 if len(results["failed"]) > 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
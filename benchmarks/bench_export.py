@@ -0,0 +1,75 @@
+"""
+bench_export.py
+
+Compares the wall time and peak memory of ChartFile.export against the original
+string concatenation export on a multi-difficulty marathon chart.
+
+Usage: python benchmarks/bench_export.py
+"""
+
+import filecmp
+import sys
+import tempfile
+import time
+import tracemalloc
+from os.path import abspath, dirname, getsize, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import reference
+from osu import Osu
+from chart import Chart
+from mapgen import write_osu
+
+# An 18K co-op marathon set, so every difficulty has a Single and a DoubleGuitar track
+DIFFICULTIES = (
+    ("easy", dict(key_count=18, duration=1200000, density=6, hold_ratio=0.3, bpm_changes=200, seed=1)),
+    ("medium", dict(key_count=18, duration=1200000, density=12, hold_ratio=0.3, bpm_changes=200, seed=2)),
+    ("hard", dict(key_count=18, duration=1200000, density=20, hold_ratio=0.3, bpm_changes=200, seed=3)),
+    ("expert", dict(key_count=18, duration=1200000, density=30, hold_ratio=0.3, bpm_changes=200, seed=4))
+)
+
+# Returns (best wall time, peak traced memory) of export(fname)
+def measure(export, fname, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        export(fname)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    export(fname)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best, peak
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        osu_files = {}
+        for name, kwargs in DIFFICULTIES:
+            fname = join(directory, f"{name}.osu")
+            write_osu(fname, **kwargs)
+            osu_files[name] = Osu.create_from_path(fname)
+
+        chart = Chart.create_from_osu(osu_files["easy"], **osu_files)
+        object_count = sum(len(track) for track in chart.note_tracks)
+
+        reference_fname = join(directory, "reference.chart")
+        current_fname = join(directory, "notes.chart")
+
+        reference_time, reference_peak = measure(lambda fname: reference.export_chart_file(chart, fname), reference_fname)
+        current_time, current_peak = measure(chart.export, current_fname)
+
+        if not filecmp.cmp(reference_fname, current_fname, shallow=False):
+            print("ChartFile.export output differs from the original export!")
+            return 1
+
+        print(f"{len(chart.note_tracks)} note tracks, {object_count} notes, {getsize(current_fname) / 1024 / 1024:.1f} MiB chart")
+        print(f"  concatenation {reference_time * 1000:8.1f} ms  {reference_peak / 1024 / 1024:6.2f} MiB peak")
+        print(f"  streaming     {current_time * 1000:8.1f} ms  {current_peak / 1024 / 1024:6.2f} MiB peak")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+bench_lazy.py
+
+Compares reading parts of a storyboard-heavy marathon map with the streaming parser
+and with the memory-mapped Osu.create_from_path(fname, lazy=True) mode.
+
+Usage: python benchmarks/bench_lazy.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from osu import Osu
+from mapgen import write_osu
+
+MAPS = (
+    ("7K 2min", dict(key_count=7, duration=120000, density=8)),
+    ("10K 10min marathon + storyboard", dict(key_count=10, duration=600000, density=16, bpm_changes=50, storyboard_commands=200000))
+)
+
+# (name, function reading an OsuFile the way a caller would)
+ACCESSES = (
+    ("metadata", lambda f: (f.title, f.artist, f.version, f.key_count)),
+    ("timing points", lambda f: len(f.timing_points)),
+    ("everything", lambda f: (f.title, len(f.timing_points), len(f.hit_objects)))
+)
+
+def best_time(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for name, kwargs in MAPS:
+            fname = join(directory, "map.osu")
+            write_osu(fname, **kwargs)
+
+            eager = Osu.create_from_path(fname, columnar=True)
+            lazy = Osu.create_from_path(fname, columnar=True, lazy=True)
+            if (len(eager.timing_points), len(eager.hit_objects), eager.title) != (len(lazy.timing_points), len(lazy.hit_objects), lazy.title):
+                print(f"{name}: lazy parser output differs from streaming parser output!")
+                return 1
+
+            print(f"{name} ({len(eager.hit_objects)} notes, {os.path.getsize(fname) / 1024:.0f} KiB)")
+            for access_name, access in ACCESSES:
+                streaming = best_time(lambda: access(Osu.create_from_path(fname, headers_only=access_name == "metadata", columnar=True)), 5)
+                mapped = best_time(lambda: access(Osu.create_from_path(fname, columnar=True, lazy=True)), 5)
+                print(f"  {access_name:<14} streaming {streaming * 1000:8.2f} ms  lazy {mapped * 1000:8.2f} ms  ({streaming / mapped:.1f}x)")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+bench_memory.py
+
+Measures the memory held by a parsed OsuFile with object storage and with columnar storage,
+and by the note tracks generated from it.
+
+Usage: python benchmarks/bench_memory.py
+"""
+
+import gc
+import sys
+import tempfile
+import time
+import tracemalloc
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from osu import Osu
+from chart import _generate_note_tracks, _generate_sync_track
+from mapgen import write_osu
+
+MAPS = (
+    ("7K 30min marathon", dict(key_count=7, duration=1800000, density=10, bpm_changes=100)),
+    ("18K 20min co-op marathon", dict(key_count=18, duration=1200000, density=30, hold_ratio=0.3, bpm_changes=300))
+)
+
+# Returns (parsed OsuFile, bytes held by it, peak bytes while parsing, parse seconds)
+# Timing is done separately as tracemalloc slows down every allocation
+def measure_parse(fname, columnar):
+    start = time.perf_counter()
+    Osu.create_from_path(fname, columnar=columnar)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    osu_file = Osu.create_from_path(fname, columnar=columnar)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return osu_file, held, peak, elapsed
+
+# Returns (bytes held by the note tracks of all four difficulties, number of track objects)
+def measure_note_tracks(osu_file):
+    gc.collect()
+    tracemalloc.start()
+    note_tracks = [t for d in ("Expert", "Hard", "Medium", "Easy") for t in _generate_note_tracks(d, osu_file.timing_points, osu_file.hit_objects, osu_file.key_count)]
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return held, sum(len(t) for t in note_tracks)
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for name, kwargs in MAPS:
+            fname = join(directory, "map.osu")
+            write_osu(fname, **kwargs)
+
+            print(name)
+            for columnar in (False, True):
+                osu_file, held, peak, elapsed = measure_parse(fname, columnar)
+
+                start = time.perf_counter()
+                _generate_sync_track(osu_file.timing_points)
+                _generate_note_tracks("Expert", osu_file.timing_points, osu_file.hit_objects, osu_file.key_count)
+                generate_elapsed = time.perf_counter() - start
+
+                note_count = len(osu_file.hit_objects)
+                print(f"  {'columnar' if columnar else 'objects':<9} {note_count} notes, {len(osu_file.timing_points)} timing points: "
+                      f"{held / 1024 / 1024:6.2f} MiB held ({held / note_count:5.1f} B/note), {peak / 1024 / 1024:6.2f} MiB peak, "
+                      f"parse {elapsed * 1000:7.1f} ms, tracks {generate_elapsed * 1000:7.1f} ms")
+
+            held, object_count = measure_note_tracks(osu_file)
+            print(f"  note tracks of 4 difficulties: {object_count} track objects, {held / 1024 / 1024:6.2f} MiB held ({held / object_count:5.1f} B/object)")
+
+if __name__ == "__main__":
+    main()
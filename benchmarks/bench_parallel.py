@@ -0,0 +1,77 @@
+"""
+bench_parallel.py
+
+Compares generating the note tracks of a four-difficulty 18K co-op set one after another
+against generating them concurrently with Chart.create_from_osu(..., executor=ProcessPoolExecutor()).
+
+Usage: python benchmarks/bench_parallel.py [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from osu import Osu
+from chart import Chart
+from mapgen import write_osu
+
+# (difficulty, mapgen arguments), a full co-op set from Easy to Expert
+DIFFICULTIES = (
+    ("easy", dict(density=8, hold_ratio=0.1)),
+    ("medium", dict(density=14, hold_ratio=0.2)),
+    ("hard", dict(density=22, hold_ratio=0.3)),
+    ("expert", dict(density=32, hold_ratio=0.3))
+)
+
+def best_time(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parallel note track generation on an 18K co-op set.")
+    parser.add_argument("--workers", type=int, default=4, help="number of worker processes (default: 4)")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs, the best one is kept (default: 3)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        osu_files = {}
+        for seed, (difficulty, kwargs) in enumerate(DIFFICULTIES):
+            fname = join(directory, f"{difficulty}.osu")
+            write_osu(fname, key_count=18, duration=900000, bpm_changes=300, seed=seed, version=difficulty, **kwargs)
+            osu_files[difficulty] = Osu.create_from_path(fname, columnar=True)
+
+        note_count = sum(len(f.hit_objects) for f in osu_files.values())
+        print(f"18K co-op set, 4 difficulties, {note_count} notes, {os.cpu_count()} CPUs")
+
+        create_chart = lambda executor=None: Chart.create_from_osu(osu_files["easy"], resolution=192, executor=executor, **osu_files)
+
+        sequential = best_time(create_chart, args.repeat)
+        expected = str(create_chart())
+
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            # Start the worker processes before timing
+            create_chart(executor)
+
+            parallel = best_time(lambda: create_chart(executor), args.repeat)
+            if str(create_chart(executor)) != expected:
+                print("Parallel output differs from sequential output!")
+                return 1
+
+        print(f"  sequential              {sequential * 1000:8.1f} ms")
+        print(f"  parallel ({args.workers} workers)    {parallel * 1000:8.1f} ms  ({sequential / parallel:.2f}x)")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+bench_parse.py
+
+Compares the streaming Osu.create_from_path parser against the original ConfigParser parser.
+
+Usage: python benchmarks/bench_parse.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from osu import Osu
+from mapgen import write_osu
+from reference import configparser_create_from_path, osu_file_values
+
+MAPS = (
+    ("7K 2min", dict(key_count=7, duration=120000, density=8)),
+    ("4K 5min dense", dict(key_count=4, duration=300000, density=20, hold_ratio=0.1)),
+    ("10K 10min marathon", dict(key_count=10, duration=600000, density=16, bpm_changes=50))
+)
+
+def measure(parse, fname, repeat):
+    tracemalloc.start()
+    parse(fname)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(fname)
+        best = min(best, time.perf_counter() - start)
+
+    return best, peak
+
+def main():
+    parsers = (
+        ("configparser", configparser_create_from_path),
+        ("streaming", Osu.create_from_path),
+        ("streaming headers", lambda fname: Osu.create_from_path(fname, headers_only=True))
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, kwargs in MAPS:
+            fname = join(directory, "map.osu")
+            write_osu(fname, **kwargs)
+
+            expected = osu_file_values(configparser_create_from_path(fname))
+            if osu_file_values(Osu.create_from_path(fname)) != expected:
+                print(f"{name}: streaming parser output differs from ConfigParser output!")
+                return 1
+
+            note_count = len(expected[2])
+            print(f"{name} ({note_count} notes, {os.path.getsize(fname) / 1024:.0f} KiB)")
+            for parser_name, parse in parsers:
+                best, peak = measure(parse, fname, 5)
+                print(f"  {parser_name:<18} {best * 1000:8.2f} ms  {peak / 1024 / 1024:7.2f} MiB peak")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
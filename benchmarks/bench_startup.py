@@ -0,0 +1,122 @@
+"""
+bench_startup.py
+
+Times the import of every module in a fresh interpreter with python -X importtime,
+and checks that the converter modules never import the GUI toolkit. osu2chart.pyw is also run the way
+the conversion processes of the GUI import it when they are spawned, which must not import it either.
+
+Usage: python benchmarks/bench_startup.py [--repeat 5] [--output results.json] [--baseline baseline.json] [--threshold 0.2]
+
+Results are written as JSON:
+{
+  "python": "3.11.7",
+  "modules": {
+    "<module>": {"import_us": ..., "imported": [<modules it imports that Python does not at startup>]},
+    ...
+  }
+}
+When a baseline is given, every module that takes more than threshold longer to import than in the
+baseline is reported and the exit code is 1. Converter modules that import tkinter always fail.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from os.path import abspath, dirname
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+# (name, statement) to time, none of them may import tkinter
+TARGETS = tuple((module, f"import {module}") for module in ("osu", "chart", "cache", "package", "profiling", "verify", "library", "watch", "batch")) + (
+    ("osu2chart.pyw (spawned worker)", "import runpy; runpy.run_path('osu2chart.pyw', run_name='__mp_main__')"),
+)
+GUI_MODULES = ("tkinter",)
+
+# Returns a list of (depth, module, cumulative microseconds) from the -X importtime output of running statement
+def import_times(statement):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        times.append(((len(name) - len(name.lstrip())) // 2, name.strip(), int(cumulative)))
+
+    return times
+
+# Returns the time spent importing modules while running statement in microseconds (best of repeat),
+# and the modules it imports. Modules that a bare interpreter already imports at startup are not counted
+def measure(statement, startup_modules, repeat):
+    best = None
+    for _ in range(repeat):
+        times = import_times(statement)
+        import_us = sum(us for depth, name, us in times if depth == 0 and name not in startup_modules)
+        best = import_us if best is None else min(best, import_us)
+
+    imported = sorted({name for _, name, _ in times} - startup_modules)
+
+    return {"import_us": best, "imported": imported}
+
+# Returns a list of (module, baseline microseconds, current microseconds) for every module that got slower than threshold
+def compare(results, baseline, threshold):
+    regressions = []
+    for module, module_results in results["modules"].items():
+        baseline_module = baseline.get("modules", {}).get(module)
+        if baseline_module is not None and module_results["import_us"] > baseline_module["import_us"] * (1 + threshold):
+            regressions.append((module, baseline_module["import_us"], module_results["import_us"]))
+
+    return regressions
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Time the cold import of every osu2chart module.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of fresh interpreters per module, the best is kept (default: 5)")
+    parser.add_argument("--output", metavar="JSON", help="write the results to a JSON file")
+    parser.add_argument("--baseline", metavar="JSON", help="compare against results written by an earlier --output")
+    parser.add_argument("--threshold", type=float, default=0.2, help="fraction an import may get slower before it is reported (default: 0.2)")
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    startup_modules = {name for _, name, _ in import_times("pass")}
+
+    results = {"python": platform.python_version(), "modules": {}}
+    failed = False
+
+    for module, statement in TARGETS:
+        module_results = measure(statement, startup_modules, args.repeat)
+        results["modules"][module] = module_results
+
+        gui = [name for name in module_results["imported"] if name.split(".")[0] in GUI_MODULES]
+        print(f"  {module:<30} {module_results['import_us'] / 1000:7.2f} ms  {len(module_results['imported']):3d} modules imported")
+        if len(gui) > 0:
+            print(f"GUI IMPORT {module}: {', '.join(gui)}")
+            failed = True
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+
+        regressions = compare(results, baseline, args.threshold)
+        for module, baseline_us, import_us in regressions:
+            print(f"REGRESSION {module}: {baseline_us / 1000:.2f} ms -> {import_us / 1000:.2f} ms ({import_us / baseline_us - 1:+.0%})")
+
+        if len(regressions) > 0:
+            failed = True
+        else:
+            print(f"No regressions against {args.baseline}")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+bench_sustains.py
+
+Times note track generation on tempo-mapped maps with many BPM changes and sustains,
+against the original per-sustain scan over the timing points.
+
+Usage: python benchmarks/bench_sustains.py
+"""
+
+import sys
+import tempfile
+import time
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import reference
+from osu import Osu
+from chart import _generate_note_tracks
+from mapgen import write_osu
+
+MAPS = (
+    ("7K 3min, 100 BPM changes, 80% sustains", dict(key_count=7, duration=180000, density=10, hold_ratio=0.8, bpm_changes=100)),
+    ("7K 3min, 1000 BPM changes, 80% sustains", dict(key_count=7, duration=180000, density=10, hold_ratio=0.8, bpm_changes=1000)),
+    ("4K 10min, 2000 BPM changes, 50% sustains", dict(key_count=4, duration=600000, density=12, hold_ratio=0.5, bpm_changes=2000)),
+    ("7K 20min, 10000 BPM changes, 80% sustains", dict(key_count=7, duration=1200000, density=16, hold_ratio=0.8, bpm_changes=10000))
+)
+
+def best_of(function, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for name, kwargs in MAPS:
+            fname = join(directory, "map.osu")
+            write_osu(fname, **kwargs)
+            osu_file = Osu.create_from_path(fname)
+            args = (osu_file.timing_points, osu_file.hit_objects, osu_file.key_count)
+
+            reference_time = best_of(lambda: reference.generate_note_track("ExpertSingle", *args, False))
+            current_time = best_of(lambda: _generate_note_tracks("Expert", *args))
+
+            print(f"{name} ({len(osu_file.hit_objects)} notes, {len(osu_file.timing_points)} timing points)")
+            print(f"  reference {reference_time * 1000:8.1f} ms")
+            print(f"  current   {current_time * 1000:8.1f} ms  ({reference_time / current_time:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+bench_timing.py
+
+Times [SyncTrack] and note track generation with the running float sum of TickIndex against the
+per-timing-point anchors of ExactTickIndex, and checks both charts with verify.py for drifted
+and off-grid notes.
+
+Usage: python benchmarks/bench_timing.py
+"""
+
+import io
+import sys
+import tempfile
+import time
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from osu import Osu
+from chart import Chart, ChartFile, TickIndex, ExactTickIndex, _generate_note_tracks, _generate_sync_track
+from mapgen import write_osu
+from verify import verify_chart
+
+MAPS = (
+    ("7K 3min, 100 BPM changes", dict(key_count=7, duration=180000, density=10, hold_ratio=0.3, bpm_changes=100)),
+    ("7K 30min marathon, 100 BPM changes", dict(key_count=7, duration=1800000, density=10, hold_ratio=0.3, bpm_changes=100)),
+    ("4K 10min, 2000 BPM changes", dict(key_count=4, duration=600000, density=12, hold_ratio=0.5, bpm_changes=2000)),
+    ("7K 10min, 10000 distinct BPMs", dict(key_count=7, duration=600000, density=10, hold_ratio=0.3, bpm_changes=10000, distinct_bpms=True))
+)
+
+ENGINES = (
+    ("float", lambda timing_points: TickIndex(timing_points)),
+    ("exact", lambda timing_points: ExactTickIndex(timing_points)),
+    ("exact 1/192", lambda timing_points: ExactTickIndex(timing_points, snap=192))
+)
+
+def best_of(function, repeat=7):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+# Generates the [SyncTrack] and Expert note tracks of an OsuFile with a TickIndex
+def generate(osu_file, create_index):
+    tick_index = create_index(osu_file.timing_points)
+    return (_generate_sync_track(osu_file.timing_points, tick_index=tick_index),
+        _generate_note_tracks("Expert", osu_file.timing_points, osu_file.hit_objects, osu_file.key_count, tick_index=tick_index))
+
+# Writes the tracks to a chart and reads it back, so it is verified exactly as it would be exported
+def verify(osu_file, sync_track, note_tracks):
+    chart_file = ChartFile()
+    chart_file.song["Offset"] = round(osu_file.timing_points[0].time / 1000, 3)
+    chart_file.song["Resolution"] = 96
+    chart_file.sync_track = sync_track
+    chart_file.note_tracks = note_tracks
+
+    return verify_chart(Chart.create_from_lines(io.StringIO(str(chart_file))), {"Expert": osu_file})["Expert"]
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for name, kwargs in MAPS:
+            fname = join(directory, "map.osu")
+            write_osu(fname, **kwargs)
+            osu_file = Osu.create_from_path(fname)
+
+            print(f"{name} ({len(osu_file.hit_objects)} notes, {len(osu_file.timing_points)} timing points)")
+
+            float_time = None
+            for engine, create_index in ENGINES:
+                elapsed, (sync_track, note_tracks) = best_of(lambda: generate(osu_file, create_index))
+                report = verify(osu_file, sync_track, note_tracks)
+
+                if float_time is None:
+                    float_time = elapsed
+
+                print(f"  {engine:<12} {elapsed * 1000:8.1f} ms ({float_time / elapsed:.2f}x)  max error {report['max_error_ms']:6.2f} ms, "
+                      f"{report['drifted']} drifted, {report['off_grid']} off-grid, {report['drifted_sustains']} drifted sustains")
+
+if __name__ == "__main__":
+    main()
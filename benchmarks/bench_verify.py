@@ -0,0 +1,98 @@
+"""
+bench_verify.py
+
+Times batch.py --verify against the conversion it checks. A beatmap set is converted the way batch.py
+converts it (parse, generate and export), and then verified the way batch.py verifies it (read the
+notes.chart back and compare it with the .osu files).
+
+Usage: python benchmarks/bench_verify.py [--repeat 5] [--max-ratio 1.0]
+
+Reading the chart back is timed on its own as well. The sets are converted without --exact-timing,
+so the drifted and off-grid notes printed for them are the real drift of the running float sum
+over their BPM changes (see bench_timing.py). The exit code is 1 if verifying a set takes
+longer than max-ratio times converting it.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from osu import Osu
+from chart import Chart
+from batch import verify_set
+from mapgen import write_osu
+
+# (name, {difficulty: mapgen arguments})
+# Every difficulty of a set has the same seed, so they share the timing points of the set as in a real beatmap set
+# and only their density and hold ratio differ
+SETS = (
+    ("4K 3min", {d: dict(key_count=4, duration=180000, density=4 + 4 * i, hold_ratio=0.05 + 0.05 * i, bpm_changes=5, seed=1)
+        for i, d in enumerate(("easy", "medium", "hard", "expert"))}),
+    ("7K 5min", {d: dict(key_count=7, duration=300000, density=6 + 6 * i, hold_ratio=0.15 + 0.05 * i, bpm_changes=20, seed=2)
+        for i, d in enumerate(("easy", "medium", "hard", "expert"))}),
+    ("10K co-op 5min", {d: dict(key_count=10, duration=300000, density=6 + 6 * i, hold_ratio=0.15 + 0.05 * i, bpm_changes=20, seed=3)
+        for i, d in enumerate(("easy", "medium", "hard", "expert"))})
+)
+
+def best_of(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+# Converts a set the way batch.py does without --package, the easiest difficulty provides the SyncTrack
+def convert(osu_fnames, chart_fname):
+    difficulties = {d: Osu.create_from_path(fname, columnar=True) for d, fname in osu_fnames.items()}
+    source_osu_file = next(difficulties[d] for d in ("easy", "medium", "hard", "expert") if d in difficulties)
+
+    Chart.create_from_osu(source_osu_file, **difficulties).export(chart_fname)
+
+    return difficulties
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Time batch.py --verify against the conversion it checks.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed runs, the best one is kept (default: 5)")
+    parser.add_argument("--max-ratio", type=float, default=1.0, help="how many times the conversion time verifying may take (default: 1.0)")
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    failed = False
+
+    with tempfile.TemporaryDirectory() as directory:
+        chart_fname = join(directory, "notes.chart")
+
+        for name, kwargs in SETS:
+            osu_fnames = {}
+            for difficulty, difficulty_kwargs in kwargs.items():
+                osu_fnames[difficulty] = join(directory, f"{difficulty}.osu")
+                write_osu(osu_fnames[difficulty], **difficulty_kwargs)
+
+            convert_time, difficulties = best_of(lambda: convert(osu_fnames, chart_fname), args.repeat)
+            read_time, _ = best_of(lambda: Chart.create_from_path(chart_fname), args.repeat)
+            verify_time, problems = best_of(lambda: verify_set(chart_fname, difficulties), args.repeat)
+
+            notes = sum(len(osu_file.hit_objects) for osu_file in difficulties.values())
+            ratio = verify_time / convert_time
+            print(f"{name} ({notes} notes)")
+            print(f"  convert {convert_time * 1000:8.1f} ms")
+            print(f"  verify  {verify_time * 1000:8.1f} ms ({ratio:.2f}x convert), {read_time * 1000:.1f} ms of it reading notes.chart back")
+
+            if problems is not None:
+                print(f"  {problems}")
+            if ratio > args.max_ratio:
+                print(f"SLOW VERIFY {name}: {ratio:.2f}x the conversion time, more than {args.max_ratio:.2f}x")
+                failed = True
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
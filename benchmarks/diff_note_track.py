@@ -0,0 +1,127 @@
+"""
+diff_note_track.py
+
+Differential check of the note and sync track generation against the original
+implementation in reference.py, over a range of generated maps.
+
+Usage: python benchmarks/diff_note_track.py [number of maps]
+"""
+
+import random
+import sys
+import tempfile
+import time
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import reference
+from osu import Osu
+from chart import _generate_note_tracks, _generate_sync_track
+from mapgen import write_osu
+
+KEY_COUNTS = (1, 4, 5, 6, 7, 8, 9, 10, 11, 12, 14, 16, 18)
+RESOLUTIONS = (96, 192, 480)
+
+# Returns expected without the first line that is missing from actual,
+# if that is the only difference between them
+def drop_extra_line(expected, actual):
+    expected_lines = expected.splitlines(keepends=True)
+    actual_lines = actual.splitlines(keepends=True)
+
+    if len(expected_lines) == len(actual_lines) + 1:
+        for i, (e, a) in enumerate(zip(expected_lines, actual_lines + [""])):
+            if e != a:
+                return "".join(expected_lines[:i] + expected_lines[i + 1:])
+
+    return expected
+
+# Returns the number of notes whose sustain lengths differ by at most one quantization step (2 ticks),
+# or None if the tracks differ in any other way
+def hold_rounding_differences(expected, actual):
+    expected_lines = expected.splitlines()
+    actual_lines = actual.splitlines()
+
+    if len(expected_lines) != len(actual_lines):
+        return None
+
+    differences = 0
+    for e, a in zip(expected_lines, actual_lines):
+        if e != a:
+            e_fields = e.rsplit(" ", 1)
+            a_fields = a.rsplit(" ", 1)
+            if e_fields[0] != a_fields[0] or abs(int(e_fields[1]) - int(a_fields[1])) > 2:
+                return None
+            differences += 1
+
+    return differences
+
+def main(argv):
+    map_count = int(argv[0]) if len(argv) > 0 else 200
+    rng = random.Random(0)
+    failures = 0
+    repeated_last_notes = 0
+    hold_rounding_notes = 0
+    reference_elapsed = 0.0
+    current_elapsed = 0.0
+
+    with tempfile.TemporaryDirectory() as directory:
+        fname = join(directory, "map.osu")
+
+        for i in range(map_count):
+            kwargs = dict(
+                key_count=rng.choice(KEY_COUNTS),
+                duration=rng.randint(1000, 180000),
+                density=rng.choice((0.5, 2, 8, 20)),
+                hold_ratio=rng.random(),
+                bpm_changes=rng.choice((0, 1, 5, 50, 200)),
+                seed=i
+            )
+            resolution = rng.choice(RESOLUTIONS)
+            write_osu(fname, **kwargs)
+
+            for columnar in (False, True):
+                osu_file = Osu.create_from_path(fname, columnar=columnar)
+                if osu_file is None or len(osu_file.hit_objects) == 0:
+                    continue
+
+                # The original generator made one pass per track, the current one makes a single pass for all of them
+                start = time.perf_counter()
+                note_tracks = _generate_note_tracks("Expert", osu_file.timing_points, osu_file.hit_objects, osu_file.key_count, resolution)
+                current_elapsed += time.perf_counter() - start
+
+                for is_coop, note_track in zip((False, True), note_tracks):
+                    name = "ExpertDoubleGuitar" if is_coop else "ExpertSingle"
+                    start = time.perf_counter()
+                    expected = str(reference.generate_note_track(name, osu_file.timing_points, osu_file.hit_objects, osu_file.key_count, is_coop, resolution))
+                    reference_elapsed += time.perf_counter() - start
+
+                    actual = str(note_track)
+
+                    # The original generator repeated the last note when timing points followed it,
+                    # so drop that one extra line before comparing
+                    if osu_file.timing_points[-1].time > osu_file.hit_objects[-1].time:
+                        expected = drop_extra_line(expected, actual)
+                        repeated_last_notes += 1
+
+                    # Sustain lengths are measured from absolute ticks since the O(log T) tick index,
+                    # which can round a sustain that lands right between two quantization steps differently
+                    differences = hold_rounding_differences(expected, actual)
+                    if differences is not None:
+                        hold_rounding_notes += differences
+                    else:
+                        failures += 1
+                        print(f"note track differs: {kwargs}, resolution={resolution}, columnar={columnar}, is_coop={is_coop}")
+
+                if str(_generate_sync_track(osu_file.timing_points, resolution)) != str(reference.generate_sync_track(osu_file.timing_points, resolution)):
+                    failures += 1
+                    print(f"sync track differs: {kwargs}, resolution={resolution}, columnar={columnar}")
+
+    print(f"{map_count} maps, {failures} differences ({repeated_last_notes} tracks with a repeated last note in the reference)")
+    print(f"{hold_rounding_notes} sustains rounded to the neighbouring 2 tick step")
+    print(f"note tracks: reference {reference_elapsed:.2f}s, current {current_elapsed:.2f}s")
+
+    return 1 if failures > 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,126 @@
+"""
+mapgen.py
+
+Deterministic generator for synthetic osu!mania .osu files used by the benchmarks.
+"""
+
+import random
+from math import floor
+
+_BPMS = (90, 120, 128, 140, 150, 160, 173.5, 180, 200, 222.22, 240)
+
+# Returns the text of a synthetic osu!mania .osu file
+#
+# key_count    - number of columns (4, 7, 9, or 10/18 for co-op maps)
+# duration     - length of the map in milliseconds
+# density      - average number of notes per second
+# hold_ratio   - fraction of notes that are long notes
+# bpm_changes  - number of uninherited timing points after the first one
+# seed         - seed for the random number generator, equal arguments always produce equal files
+# storyboard_commands - number of storyboard sprite commands in [Events], as in storyboard-heavy maps
+# distinct_bpms - give every uninherited timing point its own BPM from 60 to 300 instead of one of _BPMS, as in maps timed to live recordings
+def generate_osu(key_count=7, duration=120000, density=8.0, hold_ratio=0.2, bpm_changes=0, seed=0, version=None, storyboard_commands=0, distinct_bpms=False):
+    rng = random.Random(seed)
+
+    lines = [
+        "osu file format v14",
+        "",
+        "[General]",
+        "AudioFilename: audio.mp3",
+        "AudioLeadIn: 0",
+        "PreviewTime: 30000",
+        "Countdown: 0",
+        "SampleSet: Soft",
+        "StackLeniency: 0.7",
+        "Mode: 3",
+        "LetterboxInBreaks: 0",
+        "SpecialStyle: 0",
+        "WidescreenStoryboard: 0",
+        "",
+        "[Editor]",
+        "Bookmarks: 1000,20000,40000",
+        "DistanceSpacing: 1",
+        "BeatDivisor: 4",
+        "GridSize: 4",
+        "TimelineZoom: 1",
+        "",
+        "[Metadata]",
+        "Title:Synthetic Map",
+        "TitleUnicode:Synthetic Map",
+        "Artist:osu2chart",
+        "ArtistUnicode:osu2chart",
+        "Creator:mapgen",
+        f"Version:{version or f'{key_count}K {density:g}nps'}",
+        "Source:",
+        "Tags:benchmark synthetic",
+        "BeatmapID:0",
+        "BeatmapSetID:-1",
+        "",
+        "[Difficulty]",
+        "HPDrainRate:8",
+        f"CircleSize:{key_count}",
+        "OverallDifficulty:8",
+        "ApproachRate:5",
+        "SliderMultiplier:1.4",
+        "SliderTickRate:1",
+        "",
+        "[Events]",
+        "//Background and Video events",
+        "0,0,\"bg.jpg\",0,0",
+        "//Break Periods",
+        "//Storyboard Layer 0 (Background)"
+    ]
+
+    for i in range(storyboard_commands):
+        if i % 16 == 0:
+            lines.append(f"Sprite,Background,Centre,\"sb/{i // 16}.png\",320,240")
+        lines.append(f" F,0,{i * 10},{i * 10 + 500},0,1")
+
+    lines += [
+        "",
+        "[TimingPoints]"
+    ]
+
+    # Timing points are spread evenly over the map, each one followed by an SV (inherited) point
+    start_time = 1000
+    section_length = duration / (bpm_changes + 1)
+    sections = []
+    for i in range(bpm_changes + 1):
+        time = start_time + floor(i * section_length)
+        beat_length = 60000 / (rng.uniform(60, 300) if distinct_bpms else rng.choice(_BPMS))
+        meter = 3 if rng.random() < 0.2 else 4
+        sections.append((time, beat_length))
+        lines.append(f"{time},{beat_length},{meter},2,0,40,1,0")
+        lines.append(f"{time},-{rng.choice((50, 100, 200))},{meter},2,0,40,0,0")
+
+    lines += ["", "", "[HitObjects]"]
+
+    # Notes are placed on a 1/4 grid of the current timing point
+    end_time = start_time + duration
+    for s, (time, beat_length) in enumerate(sections):
+        section_end = sections[s + 1][0] if s + 1 < len(sections) else end_time
+        step = beat_length / 4
+        notes_per_step = density * step / 1000
+
+        k = 0
+        while True:
+            note_time = round(time + k * step)
+            if note_time >= section_end:
+                break
+            k += 1
+
+            note_count = floor(notes_per_step) + (rng.random() < notes_per_step % 1)
+            for column in sorted(rng.sample(range(key_count), min(note_count, key_count))):
+                x = floor((column + 0.5) * 512 / key_count)
+                if rng.random() < hold_ratio:
+                    hold_end = round(note_time + step * rng.randint(2, 16))
+                    lines.append(f"{x},192,{note_time},128,0,{hold_end}:0:0:0:0:")
+                else:
+                    lines.append(f"{x},192,{note_time},1,0,0:0:0:0:")
+
+    return "\n".join(lines) + "\n"
+
+# Writes a synthetic .osu file to fname, see generate_osu for the arguments
+def write_osu(fname, **kwargs):
+    with open(fname, "w", encoding="utf-8") as file:
+        file.write(generate_osu(**kwargs))
@@ -0,0 +1,405 @@
+"""
+reference.py
+
+Reference copies of earlier converter implementations, kept so the benchmarks
+can compare the current code against them.
+"""
+
+import copy
+from math import floor
+from os.path import exists
+from configparser import ConfigParser
+
+from osu import OsuFile, OsuHitObject, OsuTimingPoint
+
+# The original ConfigParser based Osu.create_from_path
+def configparser_create_from_path(fname):
+    if exists(fname) and fname[-4:] == ".osu":
+        content = ""
+        with open(fname, "r", encoding="utf-8") as file:
+            content = file.read()
+
+        # A .osu file is essentially a .ini file
+        cfg = ConfigParser(allow_no_value=True, delimiters=":", comment_prefixes="//", strict=False)
+        cfg.read_string("".join(content.split("\n", 2)[2:])) # start parsing on the [General] line to avoid MissingSectionHeaderError
+
+        osu_file = OsuFile()
+
+        # Check mode right away to ensure we're even dealing with an osu!mania map (mode must be 3)
+        osu_file.mode = cfg.getint("General", "Mode")
+        if osu_file.mode != 3:
+            print("Not a valid osu!mania map.")
+            return
+
+        # Get metadata information and key count
+        osu_file.audio_filename = cfg.get("General", "AudioFilename")
+        osu_file.audio_lead_in  = cfg.getint("General", "AudioLeadIn")
+        osu_file.preview_time   = cfg.getint("General", "PreviewTime")
+        osu_file.special_style  = cfg.getint("General", "SpecialStyle")
+
+        if cfg.has_option("Editor", "Bookmarks"):
+            osu_file.bookmarks = [int(x) for x in cfg.get("Editor", "Bookmarks").split(",")]
+
+        osu_file.title          = cfg.get("Metadata", "Title")
+        osu_file.title_unicode  = cfg.get("Metadata", "TitleUnicode")
+        osu_file.artist         = cfg.get("Metadata", "Artist")
+        osu_file.artist_unicode = cfg.get("Metadata", "ArtistUnicode")
+        osu_file.creator        = cfg.get("Metadata", "Creator")
+        osu_file.version        = cfg.get("Metadata", "Version")
+        osu_file.source         = cfg.get("Metadata", "Source")
+        osu_file.tags           = cfg.get("Metadata", "Tags")
+
+        osu_file.key_count          = cfg.getint("Difficulty", "CircleSize")
+        osu_file.overall_difficulty = cfg.getfloat("Difficulty", "OverallDifficulty")
+
+        # Taking advantage of ConfigParser's allow_no_value feature here
+        # to easily get lists of the map's TimingPoints and HitObjects
+        for t in cfg.items("TimingPoints"):
+            parsed_timing_point = t[0].split(",")
+
+            # Only append uninherited points (no SVs)
+            if parsed_timing_point[6] == "1":
+                timing_point = OsuTimingPoint(
+                    # very rarely the editor will spit out floating point time values, so double cast to be safe
+                    time=int(float(parsed_timing_point[0])),
+                    beat_length=float(parsed_timing_point[1]),
+                    meter=int(parsed_timing_point[2]),
+                    sample_set=int(parsed_timing_point[3]),
+                    sample_index=int(parsed_timing_point[4]),
+                    volume=int(parsed_timing_point[5]),
+                    uninherited=("1" == parsed_timing_point[6]), # True if 1, False if 0
+                    effects=int(parsed_timing_point[7])
+                )
+
+                osu_file.timing_points.append(timing_point)
+
+        for h in cfg.items("HitObjects"):
+            parsed_hit_object = (h[0]+":"+h[1]).split(",") # add missing colon before comma split
+            x = int(parsed_hit_object[0])
+            time = int(parsed_hit_object[2])
+            type = int(parsed_hit_object[3])
+            end_time = 0
+
+            # osu!mania hold notes are formatted with an extra field
+            # for the end_time of the note which doesn't exist otherwise
+            if type & 128:
+                end_time = int(parsed_hit_object[5].split(":")[0])
+
+            mania_hit_object = OsuHitObject(x, time, type, end_time)
+
+            osu_file.hit_objects.append(mania_hit_object)
+
+        # Prepend an OsuTimingPoint for any hit objects that maybe have
+        # been placed before the first real OsuTimingPoint
+        if len(osu_file.hit_objects) > 0:
+            if osu_file.hit_objects[0].time < osu_file.timing_points[0].time:
+                osu_file.timing_points.insert(0, copy.copy(osu_file.timing_points[0]))
+                osu_file.timing_points[0].time = osu_file.hit_objects[0].time
+
+        return osu_file
+    else:
+        return None
+
+# The original track generation from chart.py, using its own copies of the track classes
+# Every generator returns a ChartTrack whose str() is the exact text the original converter wrote
+def beat_length_to_bpm(beat_length):
+    return 1 / beat_length * 60000
+
+def x_to_key_column(x, key_count):
+    return floor(x * key_count / 512)
+
+class SyncTrackBPM:
+    _identifier = "B"
+
+    def __init__(self, bpm):
+        self.bpm = round(bpm * 1000)
+
+    def __str__(self):
+        return f"{self._identifier} {self.bpm}"
+
+class SyncTrackTS:
+    _identifier = "TS"
+
+    def __init__(self, ts):
+        self.ts = ts
+
+    def __str__(self):
+        return f"{self._identifier} {self.ts}"
+
+class NoteTrackNote:
+    _identifier = "N"
+
+    def __init__(self, note, hold_time):
+        self.note = note
+        self.hold_time = hold_time
+
+    def __str__(self):
+        return f"{self._identifier} {self.note} {self.hold_time}"
+
+class NoteTrackSP:
+    _identifier = "S"
+
+    def __init__(self, note, hold_time):
+        self.note = note
+        self.hold_time = hold_time
+
+    def __str__(self):
+        return f"{self._identifier} {self.note} {self.hold_time}"
+
+class ChartTrack:
+    def __init__(self, name, resolution=96):
+        self.name = name
+        self.resolution = resolution
+        self.track_objects = {}
+
+    def _add_track_object(self, resolution_time, track_object):
+        if resolution_time not in self.track_objects:
+            self.track_objects.update({resolution_time: []})
+
+        self.track_objects[resolution_time].append(track_object)
+
+    """
+    [self.name]
+    {
+      str(track_object)
+      str(track_object)
+      str(track_object)
+      ...
+    }
+    """
+    def __str__(self):
+        track_string = f"[{self.name}]\n{{\n"
+        for rt in self.track_objects:
+            for track_object in self.track_objects[rt]:
+                track_string += "  " + str(rt) + " = " + str(track_object) + "\n"
+
+        track_string += "}\n"
+ 
+        return track_string
+
+# Returns a ChartTrack that represents the [SyncTrack] section of a .chart
+# based off a given list of OsuTimingPoints and a resolution 
+def generate_sync_track(timing_points, resolution=96):
+    sync_track = ChartTrack("SyncTrack", resolution)
+
+    # The first timing_point is guaranteed and is eventually used as the offset in the .chart,
+    # therefore we set the resolution_time to 0
+    sync_track._add_track_object(0, SyncTrackTS(timing_points[0].meter))
+    sync_track._add_track_object(0, SyncTrackBPM(beat_length_to_bpm(timing_points[0].beat_length)))
+
+    previous_time = timing_points[0].time
+    resolution_time = 0
+    previous_beat_length = timing_points[0].beat_length
+
+    if len(timing_points) > 1:
+        for timing_point in timing_points[1:]:
+            # Use the offset between the current and previous times
+            # when calculating the resolution_time
+            offset_time = timing_point.time - previous_time
+
+            resolution_time += (sync_track.resolution * offset_time / previous_beat_length)
+
+            # Make a quantized version of resolution_time to reduce off-snapped syncs
+            quantized_resolution_time = round(resolution_time / 2) * 2
+
+            sync_track._add_track_object(quantized_resolution_time, SyncTrackTS(timing_point.meter))
+            sync_track._add_track_object(quantized_resolution_time, SyncTrackBPM(beat_length_to_bpm(timing_point.beat_length)))
+
+            # Update previous time / beat_length values for the next timing_point
+            previous_time = timing_point.time
+            previous_beat_length = timing_point.beat_length
+
+    return sync_track
+
+# Returns a ChartTrack that represents a note track section of a .chart (e.g. [ExpertSingle])
+# based off a name, given list of OsuTimingPoints, list of OsuHitObjects, key count, is co-op, and resolution
+#
+# Will return None if there are no hit objects in the list of OsuHitObjects
+def generate_note_track(name, timing_points, hit_objects, key_count, is_coop, resolution=96):
+    note_track = ChartTrack(name, resolution)
+
+    resolution_time = 0
+
+    # Make sure that any hit_objects exist
+    if len(hit_objects) > 0:
+        hit_object_index = 0
+        hit_object = hit_objects[hit_object_index]
+        previous_hit_object_time = timing_points[0].time
+
+        hit_object_count = len(hit_objects)
+        timing_point_count = len(timing_points)
+        finish_last_point = False
+
+        previous_timing_point = timing_points[0]
+        next_timing_point = timing_points[0]
+
+        # TODO: Make this more understandable... it is way too complicated
+        for t, timing_point in enumerate(timing_points):
+            # Keep track of the next_timing_point
+            if t < timing_point_count - 1:
+                next_timing_point = timing_points[t+1]
+            else:
+                finish_last_point = True
+
+            # When there is a timing point (BPM/TS change) between notes,
+            # the resolution_time need to take in account the time
+            # lost between the last note in the previous timing point
+            # and the current timing point
+            if previous_hit_object_time < timing_point.time:
+                resolution_time += (note_track.resolution * (timing_point.time - previous_hit_object_time) / previous_timing_point.beat_length)
+                
+                # If there weren't any hit objects within the current timing point,
+                # the current timing point will have to work as the previous hit object time
+                # due to how offset_time and resolution_time are calculated below
+                previous_hit_object_time = timing_point.time
+
+            while (hit_object.time < next_timing_point.time and hit_object_index < hit_object_count) or finish_last_point:
+                # Use the offset between the current and previous hit object times
+                # when calculating the resolution_time
+                offset_time = hit_object.time - previous_hit_object_time
+
+                # Sustains
+                hold_time = 0
+                quantized_hold_time = 0
+                if hit_object.end_time > 0:
+                    hold_section_start_time = hit_object.time # The start time for a section of the sustain (each sustain is divided into "sections" by BPM changes)
+                    hold_finish_last_point = False
+                    hold_next_timing_point = timing_point
+
+                    # Look at upcoming timing points to compensate for sustains that span over multiple BPM changes
+                    for ht, hold_timing_point in enumerate(timing_points[t:], start=t):
+                        if ht < timing_point_count - 1:
+                            hold_next_timing_point = timing_points[ht+1]
+                        else:
+                            hold_finish_last_point = True
+
+                        if hit_object.end_time > hold_next_timing_point.time and not hold_finish_last_point:
+                            hold_time += note_track.resolution * ((hold_next_timing_point.time - hold_section_start_time) / hold_timing_point.beat_length)
+                        else:
+                            hold_time += note_track.resolution * ((hit_object.end_time - hold_section_start_time) / hold_timing_point.beat_length)
+                            break
+
+                        hold_section_start_time = hold_next_timing_point.time
+
+                    # Make a quantized version of hold_time to reduce off-snapped sustains
+                    quantized_hold_time = round(hold_time / 2) * 2
+
+                # Add to resolution_time to get the time position of the note
+                resolution_time += (note_track.resolution * offset_time / timing_point.beat_length)
+
+                # Make a quantized version of resolution_time to reduce off-snapped notes
+                quantized_resolution_time = round(resolution_time / 2) * 2
+
+                # TODO: Organize this better, way too much duplicate code
+                hit_object_column = x_to_key_column(hit_object.x, key_count)
+                note_value = -1
+                track_object = None
+
+                # Co-op maps
+                if key_count > 9:
+                    key_mode = floor(key_count / 2)
+
+                    # 2P side
+                    if is_coop and hit_object_column >= key_mode:
+                        if key_mode < 6:
+                            note_value = hit_object_column - (key_mode * is_coop)
+                            track_object = NoteTrackNote(note_value, quantized_hold_time)
+                        else:
+                            # Open note
+                            if hit_object_column % key_mode == 0:
+                                track_object = NoteTrackNote(7, quantized_hold_time)
+                            # Starpower
+                            elif hit_object_column % key_mode == 8:
+                                track_object = NoteTrackSP(2, quantized_hold_time)
+                            # GRYBO + Force + Tap
+                            else:
+                                note_value = hit_object_column - (key_mode * is_coop) - 1
+                                track_object = NoteTrackNote(note_value, quantized_hold_time)
+                    # 1P side
+                    elif not is_coop and hit_object_column < key_mode:
+                        if key_mode < 6:
+                            note_value = hit_object_column - (key_mode * is_coop)
+                            track_object = NoteTrackNote(note_value, quantized_hold_time)
+                        else:
+                            # Open note
+                            if hit_object_column % key_mode == 0:
+                                track_object = NoteTrackNote(7, quantized_hold_time)
+                            # Starpower
+                            elif hit_object_column % key_mode == 8:
+                                track_object = NoteTrackSP(2, quantized_hold_time)
+                            # GRYBO + Force + Tap
+                            else:
+                                note_value = hit_object_column - (key_mode * is_coop) - 1
+                                track_object = NoteTrackNote(note_value, quantized_hold_time)
+                # Single player maps
+                else:
+                    if key_count < 6:
+                        note_value = hit_object_column
+                        track_object = NoteTrackNote(note_value, quantized_hold_time)
+                    else:
+                        # Open note
+                        if hit_object_column == 0:
+                            track_object = NoteTrackNote(7, quantized_hold_time)
+                        # Starpower
+                        elif hit_object_column == 8:
+                            track_object = NoteTrackSP(2, quantized_hold_time)
+                        # GRYBO + Force + Tap
+                        else:
+                            note_value = hit_object_column - 1
+                            track_object = NoteTrackNote(note_value, quantized_hold_time)
+                
+                if track_object is not None:
+                    note_track._add_track_object(quantized_resolution_time, track_object)
+
+                previous_hit_object_time = hit_object.time
+                hit_object_index += 1
+
+                # Break out after processing the last hit_object on the last timing_point
+                if hit_object_index >= hit_object_count:
+                    finish_last_point = False
+                    break
+
+                # Update hit_object for next iteration of the while loop
+                hit_object = hit_objects[hit_object_index]
+
+            previous_timing_point = timing_point
+    else:
+        return None
+
+    return note_track
+
+# The original ChartFile.export, which built the whole chart with repeated string concatenation
+# Works on any chart.ChartFile
+def export_chart_file(chart_file, fname):
+    chart_string = "[Song]\n{\n"
+    for k in chart_file.song:
+        if type(chart_file.song[k]) is str and k != "Player2":
+            chart_string += f"  {k} = \"{chart_file.song[k]}\"\n"
+        else:
+            chart_string += f"  {k} = {chart_file.song[k]}\n"
+
+    chart_string += "}\n"
+
+    for track in [chart_file.sync_track] + chart_file.note_tracks:
+        track_string = f"[{track.name}]\n{{\n"
+        track_objects = track.track_objects
+        for rt in track_objects:
+            for track_object in track_objects[rt]:
+                track_string += "  " + str(rt) + " = " + str(track_object) + "\n"
+
+        track_string += "}\n"
+        chart_string += track_string
+
+    with open(fname, "w+", encoding="utf-8") as file:
+        file.write(chart_string)
+
+# Attributes that the original parser doesn't read
+_NEW_ATTRIBUTES = ("background_filename", "video_filename", "video_offset")
+
+# Returns a tuple of every value stored in an OsuFile, used to check that two OsuFiles are identical
+def osu_file_values(osu_file):
+    header = tuple(v for k, v in sorted(vars(osu_file).items()) if k not in ("timing_points", "hit_objects") + _NEW_ATTRIBUTES)
+    timing_points = tuple(str(t) for t in osu_file.timing_points)
+    hit_objects = tuple(str(h) for h in osu_file.hit_objects)
+
+    return (header, timing_points, hit_objects)
@@ -0,0 +1,168 @@
+"""
+run.py
+
+Benchmark harness for the conversion pipeline. Every scenario is a synthetic map from mapgen.py,
+and the parse, sync track, note track and export stages are timed separately.
+
+Usage: python benchmarks/run.py [--quick] [--output results.json] [--baseline baseline.json] [--threshold 0.1]
+
+Results are written as JSON:
+{
+  "python": "3.11.7",
+  "scenarios": {
+    "<scenario>": {
+      "notes": ..., "timing_points": ...,
+      "stages": {"<stage>": {"seconds": ..., "ops_per_sec": ..., "peak_bytes": ...}, ...}
+    },
+    ...
+  }
+}
+When a baseline is given, every stage that is more than threshold slower than in the baseline
+is reported and the exit code is 1.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from os.path import abspath, dirname, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from osu import Osu
+from chart import Chart, TickIndex, _generate_note_tracks, _generate_sync_track
+from mapgen import write_osu
+
+# (name, mapgen arguments)
+SCENARIOS = (
+    ("4K short", dict(key_count=4, duration=90000, density=6, hold_ratio=0.1)),
+    ("4K dense", dict(key_count=4, duration=180000, density=24, hold_ratio=0.05)),
+    ("7K holds", dict(key_count=7, duration=180000, density=10, hold_ratio=0.6, bpm_changes=10)),
+    ("7K tempo mapped", dict(key_count=7, duration=240000, density=10, hold_ratio=0.3, bpm_changes=2000)),
+    ("9K", dict(key_count=9, duration=180000, density=12, hold_ratio=0.2, bpm_changes=5)),
+    ("10K co-op", dict(key_count=10, duration=180000, density=16, hold_ratio=0.2, bpm_changes=5)),
+    ("18K co-op marathon", dict(key_count=18, duration=900000, density=30, hold_ratio=0.3, bpm_changes=300))
+)
+
+QUICK_SCENARIOS = ("4K short", "7K holds", "10K co-op")
+
+# Returns (best seconds, peak traced bytes) of calling function
+# Timing and memory are measured in separate runs, as tracemalloc slows down every allocation
+def measure(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best, peak
+
+def run_scenario(fname, chart_fname, repeat):
+    osu_file = Osu.create_from_path(fname)
+    resolution = 192
+    tick_index = TickIndex(osu_file.timing_points, resolution)
+
+    chart_file = Chart.create_from_osu(osu_file, resolution=resolution, expert=osu_file)
+
+    stages = {
+        "parse": lambda: Osu.create_from_path(fname),
+        "parse_columnar": lambda: Osu.create_from_path(fname, columnar=True),
+        "sync_track": lambda: _generate_sync_track(osu_file.timing_points, resolution, TickIndex(osu_file.timing_points, resolution)),
+        "note_tracks": lambda: _generate_note_tracks("Expert", osu_file.timing_points, osu_file.hit_objects, osu_file.key_count, resolution, tick_index),
+        "export": lambda: chart_file.export(chart_fname)
+    }
+
+    results = {
+        "notes": len(osu_file.hit_objects),
+        "timing_points": len(osu_file.timing_points),
+        "stages": {}
+    }
+
+    for stage, function in stages.items():
+        seconds, peak = measure(function, repeat)
+        results["stages"][stage] = {
+            "seconds": seconds,
+            "ops_per_sec": 1 / seconds if seconds > 0 else None,
+            "peak_bytes": peak
+        }
+
+    return results
+
+# Returns a list of (scenario, stage, baseline seconds, current seconds) for every stage that got slower than threshold
+def compare(results, baseline, threshold):
+    regressions = []
+
+    for scenario, scenario_results in results["scenarios"].items():
+        baseline_stages = baseline.get("scenarios", {}).get(scenario, {}).get("stages", {})
+        for stage, stage_results in scenario_results["stages"].items():
+            if stage in baseline_stages:
+                baseline_seconds = baseline_stages[stage]["seconds"]
+                if stage_results["seconds"] > baseline_seconds * (1 + threshold):
+                    regressions.append((scenario, stage, baseline_seconds, stage_results["seconds"]))
+
+    return regressions
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the osu2chart conversion stages on synthetic maps.")
+    parser.add_argument("--quick", action="store_true", help=f"only run {', '.join(QUICK_SCENARIOS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs per stage, the best one is kept (default: 3)")
+    parser.add_argument("--output", metavar="JSON", help="write the results to this file")
+    parser.add_argument("--baseline", metavar="JSON", help="compare against results written by an earlier --output")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown that counts as a regression (default: 0.1)")
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scenarios": {}
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        fname = join(directory, "map.osu")
+        chart_fname = join(directory, "notes.chart")
+
+        for scenario, kwargs in SCENARIOS:
+            if args.quick and scenario not in QUICK_SCENARIOS:
+                continue
+
+            write_osu(fname, **kwargs)
+            scenario_results = run_scenario(fname, chart_fname, args.repeat)
+            results["scenarios"][scenario] = scenario_results
+
+            print(f"{scenario} ({scenario_results['notes']} notes, {scenario_results['timing_points']} timing points)")
+            for stage, stage_results in scenario_results["stages"].items():
+                print(f"  {stage:<15} {stage_results['seconds'] * 1000:9.2f} ms  {stage_results['ops_per_sec']:9.1f} ops/sec  {stage_results['peak_bytes'] / 1024 / 1024:7.2f} MiB peak")
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+
+        regressions = compare(results, baseline, args.threshold)
+        for scenario, stage, baseline_seconds, seconds in regressions:
+            print(f"REGRESSION {scenario} / {stage}: {baseline_seconds * 1000:.2f} ms -> {seconds * 1000:.2f} ms ({seconds / baseline_seconds - 1:+.0%})")
+
+        if len(regressions) > 0:
+            return 1
+
+        print(f"No regressions against {args.baseline}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
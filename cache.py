@@ -0,0 +1,172 @@
+"""
+cache.py
+
+An on-disk cache of parsed .osu files and generated .chart sections, so that
+converting unchanged difficulties again only reassembles the cached sections.
+"""
+
+import hashlib
+import io
+import os
+import pickle
+import zlib
+from os.path import exists, join
+from weakref import WeakKeyDictionary
+
+from osu import Osu
+from chart import ChartFile, create_tick_index, _generate_note_tracks, _generate_song, _generate_sync_track, _no_stage, _text_writer
+
+# Bump whenever the parser or track generation changes its output, so old entries are never reused
+CACHE_VERSION = 2
+
+# A .chart section that was generated before and is written back exactly as it was
+class CachedTrack:
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+
+    def write(self, file):
+        _text_writer(file)(self.text)
+
+    def __str__(self):
+        return self.text
+
+# Cache entries are stored as one file per key, holding a zlib compressed pickle.
+# Whenever an entry is read its modification time is updated, so evicting the entries
+# with the oldest modification time once the cache grows past max_size is LRU eviction.
+class ConversionCache:
+    def __init__(self, directory, max_size=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+        if self._size > self.max_size:
+            self.evict()
+
+        # Content hash of every OsuFile returned by load_osu
+        self._digests = WeakKeyDictionary()
+
+    def _entry_path(self, key):
+        return join(self.directory, hashlib.sha1(f"{CACHE_VERSION}:{key}".encode("utf-8")).hexdigest())
+
+    # Returns the cached value for a key, or default if it is not cached
+    def get(self, key, default=None):
+        path = self._entry_path(key)
+
+        try:
+            with open(path, "rb") as file:
+                value = pickle.loads(zlib.decompress(file.read()))
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return default
+
+        # Mark the entry as recently used, it may have been evicted by another process in the meantime
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return value
+
+    # Stores a value for a key, evicting the least recently used entries if the cache is full
+    def put(self, key, value):
+        data = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        path = self._entry_path(key)
+
+        # Write to a temporary file first so other processes never read a partial entry
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+        self._size += len(data)
+        if self._size > self.max_size:
+            self.evict()
+
+    # Removes the least recently used entries until the cache is at most max_size bytes
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if self._size <= self.max_size:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._size -= size
+
+    # Parses a .osu file, or loads it from the cache if a file with the same content was parsed before.
+    # OsuFiles are cached in columnar form, see Osu.create_from_path
+    # Returns an OsuFile, or None if the .osu file did not exist or is not an osu!mania map
+    def load_osu(self, fname):
+        if not (exists(fname) and fname[-4:] == ".osu"):
+            return None
+
+        with open(fname, "rb") as file:
+            content = file.read()
+
+        digest = hashlib.blake2b(content, digest_size=20).hexdigest()
+        key = f"osu:{digest}"
+
+        # Non-mania maps are cached as False, so they aren't parsed again either
+        osu_file = self.get(key)
+        if osu_file is None:
+            osu_file = Osu.create_from_lines(io.StringIO(content.decode("utf-8")), columnar=True)
+            self.put(key, osu_file if osu_file is not None else False)
+
+        if not osu_file:
+            return None
+
+        self._digests[osu_file] = digest
+        return osu_file
+
+    # Same as Chart.create_from_osu, but for OsuFiles returned by load_osu.
+    # The [SyncTrack] and note track sections are reused from the cache and only generated
+    # when missing, the [Song] section is always generated from the cached source OsuFile
+    def create_chart(self, source_osu_file, resolution=96, preview_length=0, use_unicode_metadata=False, use_tags_as_genre=False, expert=None, hard=None, medium=None, easy=None, profiler=None, exact_timing=False, snap=None):
+        chart_file = ChartFile()
+
+        stage = profiler.stage if profiler is not None else _no_stage
+
+        _generate_song(chart_file, source_osu_file, resolution, preview_length, use_unicode_metadata, use_tags_as_genre)
+
+        # Sections only depend on the content of their .osu file, the resolution and the timing options
+        timing = f":exact:{snap}" if exact_timing else ""
+        with stage("sync_track", source_osu_file.version) as record:
+            source_digest = self._digests[source_osu_file]
+            sync_key = f"sync:{source_digest}:{resolution}{timing}"
+            chart_file.sync_track = self.get(sync_key)
+            record["cached"] = chart_file.sync_track is not None
+            if chart_file.sync_track is None:
+                sync_track = _generate_sync_track(source_osu_file.timing_points, resolution, create_tick_index(source_osu_file.timing_points, resolution, exact_timing, snap))
+                chart_file.sync_track = CachedTrack(sync_track.name, str(sync_track))
+                self.put(sync_key, chart_file.sync_track)
+
+        for difficulty, osu_file in (("Expert", expert), ("Hard", hard), ("Medium", medium), ("Easy", easy)):
+            if osu_file is not None:
+                with stage(f"note_tracks:{difficulty}", osu_file.version) as record:
+                    tracks_key = f"tracks:{self._digests[osu_file]}:{difficulty}:{resolution}{timing}"
+                    note_tracks = self.get(tracks_key)
+                    record["cached"] = note_tracks is not None
+                    record["hit_objects"] = len(osu_file.hit_objects)
+                    if note_tracks is None:
+                        note_tracks = [CachedTrack(nt.name, str(nt)) for nt in _generate_note_tracks(difficulty, osu_file.timing_points, osu_file.hit_objects, osu_file.key_count, resolution,
+                            create_tick_index(osu_file.timing_points, resolution, exact_timing, snap))]
+                        self.put(tracks_key, note_tracks)
+
+                chart_file.note_tracks.extend(note_tracks)
+
+        return chart_file
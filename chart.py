@@ -1,4 +1,12 @@
-from math import ceil, floor
+import io
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain, islice
+from math import ceil, floor, gcd
+from operator import le
+from os.path import exists
+
+from osu import OsuHitObjectColumns, hit_object_columns, timing_point_columns
 
 # Helpful conversion functions
 def beat_length_to_bpm(beat_length):
@@ -29,125 +37,378 @@ class ChartFile:
 
     def export(self, fname):
         with open(fname, "w+", encoding="utf-8") as file:
-            file.write(str(self))
+            self.write(file)
 
-    def __str__(self):
-        chart_string = "[Song]\n{\n"
+    # Writes the chart section by section to a file-like object opened in text or binary mode,
+    # without building the whole chart as a single string
+    def write(self, file):
+        write = _text_writer(file)
+
+        song_lines = ["[Song]\n{\n"]
         for k in self.song:
             if type(self.song[k]) is str and k != "Player2":
-                chart_string += f"  {k} = \"{self.song[k]}\"\n"
+                song_lines.append(f"  {k} = \"{self.song[k]}\"\n")
             else:
-                chart_string += f"  {k} = {self.song[k]}\n"
+                song_lines.append(f"  {k} = {self.song[k]}\n")
 
-        chart_string += "}\n"
+        song_lines.append("}\n")
+        write("".join(song_lines))
+
+        self.sync_track.write(write)
 
-        chart_string += str(self.sync_track)
-        
         for nt in self.note_tracks:
-            chart_string += str(nt)
+            nt.write(write)
 
-        return chart_string
+    def __str__(self):
+        chart_string = io.StringIO()
+        self.write(chart_string)
+        return chart_string.getvalue()
 
+# Returns a function that writes strings to a file-like object,
+# encoding them as UTF-8 when it is opened in binary mode
+def _text_writer(file):
+    # Already a writer returned by this function
+    if callable(file):
+        return file
+
+    if isinstance(file, (io.RawIOBase, io.BufferedIOBase)) or "b" in getattr(file, "mode", ""):
+        return lambda string: file.write(string.encode("utf-8"))
+
+    return file.write
+
+# Track objects are stored by ChartTrack as a (value, length) pair of integers,
+# _to_values and _from_values convert between the two
 class SyncTrackBPM:
     _identifier = "B"
+    _has_length = False
 
     def __init__(self, bpm):
         self.bpm = round(bpm * 1000)
 
+    def _to_values(self):
+        return (self.bpm, 0)
+
+    @classmethod
+    def _from_values(cls, value, length):
+        track_object = cls.__new__(cls)
+        track_object.bpm = value
+        return track_object
+
     def __str__(self):
         return f"{self._identifier} {self.bpm}"
 
 class SyncTrackTS:
     _identifier = "TS"
+    _has_length = False
 
     def __init__(self, ts):
         self.ts = ts
 
+    def _to_values(self):
+        return (self.ts, 0)
+
+    @classmethod
+    def _from_values(cls, value, length):
+        return cls(value)
+
     def __str__(self):
         return f"{self._identifier} {self.ts}"
 
 class NoteTrackNote:
     _identifier = "N"
+    _has_length = True
 
     def __init__(self, note, hold_time):
         self.note = note
         self.hold_time = hold_time
 
+    def _to_values(self):
+        return (self.note, self.hold_time)
+
+    @classmethod
+    def _from_values(cls, value, length):
+        return cls(value, length)
+
     def __str__(self):
         return f"{self._identifier} {self.note} {self.hold_time}"
 
 class NoteTrackSP:
     _identifier = "S"
+    _has_length = True
 
     def __init__(self, note, hold_time):
         self.note = note
         self.hold_time = hold_time
 
+    def _to_values(self):
+        return (self.note, self.hold_time)
+
+    @classmethod
+    def _from_values(cls, value, length):
+        return cls(value, length)
+
     def __str__(self):
         return f"{self._identifier} {self.note} {self.hold_time}"
 
+# The kind of a stored track object is its index in _TRACK_OBJECT_TYPES
+_TRACK_OBJECT_TYPES = (SyncTrackBPM, SyncTrackTS, NoteTrackNote, NoteTrackSP)
+_TRACK_OBJECT_KINDS = {track_object_type: kind for kind, track_object_type in enumerate(_TRACK_OBJECT_TYPES)}
+
+# Maps the identifier of every kind of track object to its kind, for reading .chart files
+_TRACK_OBJECT_IDENTIFIERS = {t._identifier: kind for kind, t in enumerate(_TRACK_OBJECT_TYPES)}
+
+# The .chart line of every kind of track object, formatted with (tick, value, length)
+_LENGTH_IDENTIFIERS = {t._identifier for t in _TRACK_OBJECT_TYPES if t._has_length}
+_TRACK_OBJECT_FORMATS = tuple(f"  {{}} = {t._identifier} {{}}{' {}' if t._has_length else ''}\n" for t in _TRACK_OBJECT_TYPES)
+
+# Track objects are stored as parallel arrays of (tick, kind, value, length) instead of one object per note.
+# Objects can be added in any order; the arrays are stably sorted by tick before they are read,
+# so objects on the same tick keep the order they were added in
 class ChartTrack:
     def __init__(self, name, resolution=96):
         self.name = name
         self.resolution = resolution
-        self.track_objects = {}
+
+        self.ticks = array("q")
+        self.kinds = array("B")
+        self.values = array("q")
+        self.lengths = array("q")
+        self._sorted = True
+        self._track_objects = None
+
+    # Adds a track object given as its kind (see _TRACK_OBJECT_TYPES), value and length
+    def add(self, tick, kind, value, length=0):
+        if self._sorted and len(self.ticks) > 0 and tick < self.ticks[-1]:
+            self._sorted = False
+        self._track_objects = None
+
+        self.ticks.append(tick)
+        self.kinds.append(kind)
+        self.values.append(value)
+        self.lengths.append(length)
 
     def _add_track_object(self, resolution_time, track_object):
-        if resolution_time not in self.track_objects:
-            self.track_objects.update({resolution_time: []})
+        self.add(resolution_time, _TRACK_OBJECT_KINDS[type(track_object)], *track_object._to_values())
+
+    # Sorts the track objects by tick if any were added out of order
+    def finalise(self):
+        if self._sorted:
+            return
+
+        # sorted() is a stable merge sort, so objects on the same tick stay in the order they were added
+        order = sorted(range(len(self.ticks)), key=self.ticks.__getitem__)
+        for column in (self.ticks, self.kinds, self.values, self.lengths):
+            column[:] = array(column.typecode, map(column.__getitem__, order))
+
+        self._sorted = True
+
+    # A dict of tick -> [track objects], in tick order
+    # The dict is built on the first access and kept until the next add(), changes to it are not stored in the track
+    @property
+    def track_objects(self):
+        if self._track_objects is None:
+            self.finalise()
+
+            track_objects = {}
+            for tick, kind, value, length in zip(self.ticks, self.kinds, self.values, self.lengths):
+                track_objects.setdefault(tick, []).append(_TRACK_OBJECT_TYPES[kind]._from_values(value, length))
 
-        self.track_objects[resolution_time].append(track_object)
+            self._track_objects = track_objects
+
+        return self._track_objects
+
+    # Number of track objects in the track
+    def __len__(self):
+        return len(self.ticks)
+
+    # Number of track objects that are formatted before each write
+    _chunk_size = 4096
 
     """
     [self.name]
     {
-      str(track_object)
+      tick = track_object
       str(track_object)
       str(track_object)
       ...
     }
     """
+    # Writes the track to a file-like object (see ChartFile.write) in chunks of _chunk_size lines
+    def write(self, file):
+        write = _text_writer(file)
+
+        self.finalise()
+
+        formats = [track_object_format.format for track_object_format in _TRACK_OBJECT_FORMATS]
+
+        write(f"[{self.name}]\n{{\n")
+        for start in range(0, len(self.ticks), self._chunk_size):
+            end = start + self._chunk_size
+            write("".join([formats[kind](tick, value, length) for tick, kind, value, length in
+                zip(self.ticks[start:end], self.kinds[start:end], self.values[start:end], self.lengths[start:end])]))
+        write("}\n")
+
     def __str__(self):
-        track_string = f"[{self.name}]\n{{\n"
-        for rt in self.track_objects:
-            for track_object in self.track_objects[rt]:
-                track_string += "  " + str(rt) + " = " + str(track_object) + "\n"
+        track_string = io.StringIO()
+        self.write(track_string)
+        return track_string.getvalue()
+
+# Maps millisecond timestamps to resolution_times (ticks) over a list of OsuTimingPoints
+#
+# The resolution_time of every timing point is precomputed as a prefix sum once,
+# so any timestamp maps to a tick with a binary search for its timing point
+class TickIndex:
+    def __init__(self, timing_points, resolution=96):
+        self.resolution = resolution
+        self.times, self.beat_lengths, self.meters = timing_point_columns(timing_points)
+
+        # Use the offset between the current and previous times when calculating each resolution_time
+        offsets = [resolution * (self.times[t] - self.times[t - 1]) / self.beat_lengths[t - 1] for t in range(1, len(self.times))]
+        self.resolution_times = list(accumulate(offsets, initial=0))
+
+    # Returns the index of the timing point that a timestamp belongs to,
+    # searching only from the timing point at index start onwards.
+    # A timestamp exactly on a timing point belongs to the previous timing point when end is True
+    def timing_point_index(self, time, start=0, end=False):
+        if end:
+            t = bisect_left(self.times, time, start) - 1
+        else:
+            t = bisect_right(self.times, time, start) - 1
 
-        track_string += "}\n"
- 
-        return track_string
+        return max(t, start)
 
-# Returns a ChartTrack that represents the [SyncTrack] section of a .chart
-# based off a given list of OsuTimingPoints and a resolution 
-def _generate_sync_track(timing_points, resolution=96):
-    sync_track = ChartTrack("SyncTrack", resolution)
+    # Returns the unquantized resolution_time of a timestamp, optionally on a known timing point
+    def resolution_time(self, time, t=None):
+        if t is None:
+            t = self.timing_point_index(time)
 
-    # The first timing_point is guaranteed and is eventually used as the offset in the .chart,
-    # therefore we set the resolution_time to 0
-    sync_track._add_track_object(0, SyncTrackTS(timing_points[0].meter))
-    sync_track._add_track_object(0, SyncTrackBPM(beat_length_to_bpm(timing_points[0].beat_length)))
+        return self.resolution_times[t] + self.resolution * (time - self.times[t]) / self.beat_lengths[t]
 
-    previous_time = timing_points[0].time
-    resolution_time = 0
-    previous_beat_length = timing_points[0].beat_length
+    # Returns the unquantized length of a sustain from time to end_time, where time is on the t-th timing point.
+    # Sustains that span over multiple BPM changes are measured with the beat length of every section they cover
+    def hold_resolution_time(self, time, end_time, t=None):
+        if t is None:
+            t = self.timing_point_index(time)
+
+        return self.resolution_time(end_time, self.timing_point_index(end_time, t, end=True)) - self.resolution_time(time, t)
+
+    # Returns the quantized tick of every timing point, where the [SyncTrack] places its BPM and TS changes
+    def timing_point_ticks(self):
+        # Make a quantized version of resolution_time to reduce off-snapped syncs
+        return [round(resolution_time / 2) * 2 for resolution_time in self.resolution_times]
+
+    # Returns the quantized tick of every hit object time in a sorted list of hit object times
+    def note_ticks(self, hit_object_times):
+        resolution_times = _hit_object_resolution_times(self.times, self.beat_lengths, hit_object_times, self.resolution)
+
+        # Make a quantized version of resolution_time to reduce off-snapped notes
+        return [round(resolution_time / 2) * 2 for resolution_time in resolution_times]
+
+    # Returns the quantized length in ticks of a sustain from time to end_time, where time is on the t-th timing point
+    def hold_ticks(self, time, end_time, t=None):
+        # Make a quantized version of hold_time to reduce off-snapped sustains
+        return round(self.hold_resolution_time(time, end_time, t) / 2) * 2
+
+# A TickIndex that places every note relative to the tick of its own timing point, instead of a running sum
+#
+# The tick of every timing point (its anchor) is chosen so that the time it has in the finished chart, played back
+# with the offset and rounded BPMs that are written to it, stays within half a tick of the timing point's time in
+# the .osu, so the error of one timing point never carries over to the next. Every note is then a single
+# multiplication from the time of its timing point, snapped to the grid counted from its anchor, so notes on a
+# beat of the .osu also land on a beat of the chart. A note can still be up to half a tick of the previous BPM
+# plus one grid step away from its hit object, which after a large tempo change is more than a tick of the new BPM.
+# snap is the number of grid steps per whole note (e.g. 192 for 1/192 notes), None keeps the 2 tick grid of TickIndex
+class ExactTickIndex(TickIndex):
+    def __init__(self, timing_points, resolution=96, snap=None):
+        super().__init__(timing_points, resolution)
+
+        # Grid step in ticks, as a reduced integer ratio
+        self.snap = snap
+        if snap is None:
+            self.step_numerator, self.step_denominator = 2, 1
+        else:
+            divisor = gcd(4 * resolution, snap)
+            self.step_numerator, self.step_denominator = 4 * resolution // divisor, snap // divisor
+
+        # The BPMs written to the [SyncTrack], in thousandths, which the chart is played back with
+        millibpms = [round(beat_length_to_bpm(beat_length) * 1000) for beat_length in self.beat_lengths]
+
+        # Milliseconds of a tick at every timing point. The times of the anchors are summed from these, but every
+        # anchor is rounded to the tick nearest to its timing point's time, so the rounding error of the sum never
+        # carries over. The time of the first timing point is written as the offset in seconds with 3 decimals,
+        # which is exact for whole milliseconds
+        tick_lengths = [60000000 / (resolution * millibpm) for millibpm in millibpms]
 
-    if len(timing_points) > 1:
-        for timing_point in timing_points[1:]:
-            # Use the offset between the current and previous times
-            # when calculating the resolution_time
-            offset_time = timing_point.time - previous_time
+        anchor_time = self.times[0]
+        anchor_tick = 0
 
-            resolution_time += (sync_track.resolution * offset_time / previous_beat_length)
+        self.anchor_ticks = [anchor_tick]
+        for t in range(1, len(self.times)):
+            tick_length = tick_lengths[t - 1]
 
-            # Make a quantized version of resolution_time to reduce off-snapped syncs
-            quantized_resolution_time = round(resolution_time / 2) * 2
+            # The nearest tick to the timing point's time (rounded half up)
+            tick = anchor_tick + floor((self.times[t] - anchor_time) / tick_length + 0.5)
+            anchor_time += (tick - anchor_tick) * tick_length
+            anchor_tick = tick
 
-            sync_track._add_track_object(quantized_resolution_time, SyncTrackTS(timing_point.meter))
-            sync_track._add_track_object(quantized_resolution_time, SyncTrackBPM(beat_length_to_bpm(timing_point.beat_length)))
+            self.anchor_ticks.append(anchor_tick)
 
-            # Update previous time / beat_length values for the next timing_point
-            previous_time = timing_point.time
-            previous_beat_length = timing_point.beat_length
+    # Returns the snapped tick of a time on the t-th timing point
+    def _snap_tick(self, time, t):
+        numerator, denominator = self.step_numerator, self.step_denominator
+        steps = round((time - self.times[t]) * self.resolution * denominator / (self.beat_lengths[t] * numerator))
+
+        return self.anchor_ticks[t] + (2 * steps * numerator + denominator) // (2 * denominator)
+
+    # Returns the snapped tick of every time in a list of times on the t-th timing point, see _snap_tick
+    def _snap_ticks(self, times, t):
+        anchor_tick, anchor_time = self.anchor_ticks[t], self.times[t]
+        numerator, denominator = self.step_numerator, self.step_denominator
+        steps_per_ms = self.resolution * denominator / (self.beat_lengths[t] * numerator)
+
+        if denominator == 1:
+            return [anchor_tick + round((time - anchor_time) * steps_per_ms) * numerator for time in times]
+
+        # Grid steps that are not a whole number of ticks are rounded to the nearest tick (half up)
+        return [anchor_tick + (2 * round((time - anchor_time) * steps_per_ms) * numerator + denominator) // (2 * denominator) for time in times]
+
+    def timing_point_ticks(self):
+        return self.anchor_ticks
+
+    def note_ticks(self, hit_object_times):
+        ticks = []
+        for t, (start, end) in enumerate(_timing_point_ranges(self.times, hit_object_times)):
+            ticks.extend(self._snap_ticks(hit_object_times[start:end], t))
+
+        return ticks
+
+    # The end of a sustain is snapped the same way as a note, so its length is exact between two grid positions
+    def hold_ticks(self, time, end_time, t=None):
+        if t is None:
+            t = self.timing_point_index(time)
+
+        return self._snap_tick(end_time, self.timing_point_index(end_time, t, end=True)) - self._snap_tick(time, t)
+
+# Returns the TickIndex for a list of OsuTimingPoints, an ExactTickIndex when exact_timing is True
+def create_tick_index(timing_points, resolution=96, exact_timing=False, snap=None):
+    if exact_timing:
+        return ExactTickIndex(timing_points, resolution, snap)
+
+    return TickIndex(timing_points, resolution)
+
+# Returns a ChartTrack that represents the [SyncTrack] section of a .chart
+# based off a given list of OsuTimingPoints and a resolution 
+def _generate_sync_track(timing_points, resolution=96, tick_index=None):
+    sync_track = ChartTrack("SyncTrack", resolution)
+
+    if tick_index is None:
+        tick_index = TickIndex(timing_points, resolution)
+
+    # The first timing_point is guaranteed and is eventually used as the offset in the .chart,
+    # therefore its resolution_time is 0
+    for quantized_resolution_time, beat_length, meter in zip(tick_index.timing_point_ticks(), tick_index.beat_lengths, tick_index.meters):
+        sync_track.add(quantized_resolution_time, _TRACK_OBJECT_KINDS[SyncTrackTS], meter)
+        sync_track.add(quantized_resolution_time, _TRACK_OBJECT_KINDS[SyncTrackBPM], round(beat_length_to_bpm(beat_length) * 1000))
 
     return sync_track
 
@@ -158,217 +419,320 @@ def _generate_events_track(timing_points, bookmarks, resolution=96):
 
     return events_track
 
-# Returns a ChartTrack that represents a note track section of a .chart (e.g. [ExpertSingle])
-# based off a name, given list of OsuTimingPoints, list of OsuHitObjects, key count, is co-op, and resolution
-#
-# Will return None if there are no hit objects in the list of OsuHitObjects
-def _generate_note_track(name, timing_points, hit_objects, key_count, is_coop, resolution=96):
-    note_track = ChartTrack(name, resolution)
+# Returns the (player, track object class, note value) that a key column is converted to
+# Player is 0 for the Single track and 1 for the DoubleGuitar track of a co-op map
+def _column_to_note(column, key_count):
+    key_mode = key_count
+    side_column = column
+    player = 0
+
+    # Co-op maps, where the 1P side comes first and the 2P side is converted to the co-op track
+    if key_count > 9:
+        key_mode = floor(key_count / 2)
+        player = int(column >= key_mode)
+
+        side_column = column % key_mode
+        column -= key_mode * player
+
+    if key_mode < 6:
+        return (player, NoteTrackNote, column)
+    # Open note
+    elif side_column == 0:
+        return (player, NoteTrackNote, 7)
+    # Starpower
+    elif side_column == 8:
+        return (player, NoteTrackSP, 2)
+    # GRYBO + Force + Tap
+    else:
+        return (player, NoteTrackNote, column - 1)
+
+# Returns the hit objects that belong to each timing point, as a (start, end) index range into hit_object_times
+# for every timing point, found with a binary search over the (sorted) hit object times
+def _timing_point_ranges(timing_point_times, hit_object_times):
+    ranges = []
+    start = 0
+
+    for t in range(1, len(timing_point_times)):
+        end = bisect_left(hit_object_times, timing_point_times[t], start)
+        ranges.append((start, end))
+        start = end
+
+    ranges.append((start, len(hit_object_times)))
 
+    return ranges
+
+# Returns the unquantized resolution_time of every hit object
+#
+# Every hit object's resolution_time is the previous one plus the offset between them, measured
+# with the beat length of the timing point the hit object belongs to. Each timing point's offsets
+# are computed as a whole and summed up in the same order, so the results stay exactly the same
+# as when adding them up one note at a time.
+def _hit_object_resolution_times(timing_point_times, beat_lengths, hit_object_times, resolution):
+    resolution_times = []
     resolution_time = 0
+    previous_time = timing_point_times[0]
+
+    for t, (start, end) in enumerate(_timing_point_ranges(timing_point_times, hit_object_times)):
+        # When there is a timing point (BPM/TS change) between notes,
+        # the resolution_time need to take in account the time
+        # lost between the last note in the previous timing point
+        # and the current timing point
+        if previous_time < timing_point_times[t]:
+            resolution_time += (resolution * (timing_point_times[t] - previous_time) / beat_lengths[t - 1])
+            previous_time = timing_point_times[t]
+
+        if start == end:
+            continue
 
+        times = hit_object_times[start:end]
+        beat_length = beat_lengths[t]
+
+        # Use the offset between the current and previous hit object times
+        offsets = [resolution * (time - previous) / beat_length for time, previous in zip(times, chain((previous_time,), times))]
+        resolution_times.extend(islice(accumulate(offsets, initial=resolution_time), 1, None))
+
+        resolution_time = resolution_times[-1]
+        previous_time = times[-1]
+
+    return resolution_times
+
+# Returns a list of ChartTracks that represent the note track sections of a .chart for a difficulty
+# (e.g. [ExpertSingle], plus [ExpertDoubleGuitar] for >9K co-op maps)
+# based off a difficulty name, given list of OsuTimingPoints, list of OsuHitObjects, key count, and resolution
+#
+# Every hit object is converted once and routed to the track of its side of the map
+# Will return an empty list if there are no hit objects in the list of OsuHitObjects
+# timing_points is only used to create a TickIndex, so it can be None when tick_index is given
+def _generate_note_tracks(difficulty, timing_points, hit_objects, key_count, resolution=96, tick_index=None):
     # Make sure that any hit_objects exist
-    if len(hit_objects) > 0:
-        hit_object_index = 0
-        hit_object = hit_objects[hit_object_index]
-        previous_hit_object_time = timing_points[0].time
-
-        hit_object_count = len(hit_objects)
-        timing_point_count = len(timing_points)
-        finish_last_point = False
-
-        previous_timing_point = timing_points[0]
-        next_timing_point = timing_points[0]
-
-        # TODO: Make this more understandable... it is way too complicated
-        for t, timing_point in enumerate(timing_points):
-            # Keep track of the next_timing_point
-            if t < timing_point_count - 1:
-                next_timing_point = timing_points[t+1]
-            else:
-                finish_last_point = True
-
-            # When there is a timing point (BPM/TS change) between notes,
-            # the resolution_time need to take in account the time
-            # lost between the last note in the previous timing point
-            # and the current timing point
-            if previous_hit_object_time < timing_point.time:
-                resolution_time += (note_track.resolution * (timing_point.time - previous_hit_object_time) / previous_timing_point.beat_length)
-                
-                # If there weren't any hit objects within the current timing point,
-                # the current timing point will have to work as the previous hit object time
-                # due to how offset_time and resolution_time are calculated below
-                previous_hit_object_time = timing_point.time
-
-            while (hit_object.time < next_timing_point.time and hit_object_index < hit_object_count) or finish_last_point:
-                # Use the offset between the current and previous hit object times
-                # when calculating the resolution_time
-                offset_time = hit_object.time - previous_hit_object_time
-
-                # Sustains
-                hold_time = 0
-                quantized_hold_time = 0
-                if hit_object.end_time > 0:
-                    hold_section_start_time = hit_object.time # The start time for a section of the sustain (each sustain is divided into "sections" by BPM changes)
-                    hold_finish_last_point = False
-                    hold_next_timing_point = timing_point
-
-                    # Look at upcoming timing points to compensate for sustains that span over multiple BPM changes
-                    for ht, hold_timing_point in enumerate(timing_points[t:], start=t):
-                        if ht < timing_point_count - 1:
-                            hold_next_timing_point = timing_points[ht+1]
-                        else:
-                            hold_finish_last_point = True
-
-                        if hit_object.end_time > hold_next_timing_point.time and not hold_finish_last_point:
-                            hold_time += note_track.resolution * ((hold_next_timing_point.time - hold_section_start_time) / hold_timing_point.beat_length)
-                        else:
-                            hold_time += note_track.resolution * ((hit_object.end_time - hold_section_start_time) / hold_timing_point.beat_length)
-                            break
-
-                        hold_section_start_time = hold_next_timing_point.time
-
-                    # Make a quantized version of hold_time to reduce off-snapped sustains
-                    quantized_hold_time = round(hold_time / 2) * 2
-
-                # Add to resolution_time to get the time position of the note
-                resolution_time += (note_track.resolution * offset_time / timing_point.beat_length)
-
-                # Make a quantized version of resolution_time to reduce off-snapped notes
-                quantized_resolution_time = round(resolution_time / 2) * 2
-
-                # TODO: Organize this better, way too much duplicate code
-                hit_object_column = x_to_key_column(hit_object.x, key_count)
-                note_value = -1
-                track_object = None
-
-                # Co-op maps
-                if key_count > 9:
-                    key_mode = floor(key_count / 2)
-
-                    # 2P side
-                    if is_coop and hit_object_column >= key_mode:
-                        if key_mode < 6:
-                            note_value = hit_object_column - (key_mode * is_coop)
-                            track_object = NoteTrackNote(note_value, quantized_hold_time)
-                        else:
-                            # Open note
-                            if hit_object_column % key_mode == 0:
-                                track_object = NoteTrackNote(7, quantized_hold_time)
-                            # Starpower
-                            elif hit_object_column % key_mode == 8:
-                                track_object = NoteTrackSP(2, quantized_hold_time)
-                            # GRYBO + Force + Tap
-                            else:
-                                note_value = hit_object_column - (key_mode * is_coop) - 1
-                                track_object = NoteTrackNote(note_value, quantized_hold_time)
-                    # 1P side
-                    elif not is_coop and hit_object_column < key_mode:
-                        if key_mode < 6:
-                            note_value = hit_object_column - (key_mode * is_coop)
-                            track_object = NoteTrackNote(note_value, quantized_hold_time)
-                        else:
-                            # Open note
-                            if hit_object_column % key_mode == 0:
-                                track_object = NoteTrackNote(7, quantized_hold_time)
-                            # Starpower
-                            elif hit_object_column % key_mode == 8:
-                                track_object = NoteTrackSP(2, quantized_hold_time)
-                            # GRYBO + Force + Tap
-                            else:
-                                note_value = hit_object_column - (key_mode * is_coop) - 1
-                                track_object = NoteTrackNote(note_value, quantized_hold_time)
-                # Single player maps
-                else:
-                    if key_count < 6:
-                        note_value = hit_object_column
-                        track_object = NoteTrackNote(note_value, quantized_hold_time)
-                    else:
-                        # Open note
-                        if hit_object_column == 0:
-                            track_object = NoteTrackNote(7, quantized_hold_time)
-                        # Starpower
-                        elif hit_object_column == 8:
-                            track_object = NoteTrackSP(2, quantized_hold_time)
-                        # GRYBO + Force + Tap
-                        else:
-                            note_value = hit_object_column - 1
-                            track_object = NoteTrackNote(note_value, quantized_hold_time)
-                
-                if track_object is not None:
-                    note_track._add_track_object(quantized_resolution_time, track_object)
-
-                previous_hit_object_time = hit_object.time
-                hit_object_index += 1
-
-                # Break out after processing the last hit_object on the last timing_point
-                if hit_object_index >= hit_object_count:
-                    finish_last_point = False
-                    break
-
-                # Update hit_object for next iteration of the while loop
-                hit_object = hit_objects[hit_object_index]
-
-            previous_timing_point = timing_point
+    if len(hit_objects) == 0:
+        return []
+
+    note_tracks = [ChartTrack(f"{difficulty}Single", resolution)]
+    if key_count > 9:
+        note_tracks.append(ChartTrack(f"{difficulty}DoubleGuitar", resolution))
+
+    if tick_index is None:
+        tick_index = TickIndex(timing_points, resolution)
+
+    # Read the columns directly to avoid creating objects for columnar OsuFiles
+    timing_point_times = tick_index.times
+    hit_object_xs, hit_object_times, _, hit_object_end_times = hit_object_columns(hit_objects)
+
+    quantized_resolution_times = tick_index.note_ticks(hit_object_times)
+
+    # There are only ever a few distinct x values, so map each one to its note once
+    x_notes = {}
+    for x in set(hit_object_xs):
+        player, track_object_type, note_value = _column_to_note(x_to_key_column(x, key_count), key_count)
+        x_notes[x] = (note_tracks[player].add, _TRACK_OBJECT_KINDS[track_object_type], note_value)
+
+    for t, (start, end) in enumerate(_timing_point_ranges(timing_point_times, hit_object_times)):
+        for h in range(start, end):
+            # Sustains
+            quantized_hold_time = 0
+            if hit_object_end_times[h] > 0:
+                quantized_hold_time = tick_index.hold_ticks(hit_object_times[h], hit_object_end_times[h], t)
+
+            add, kind, note_value = x_notes[hit_object_xs[h]]
+            add(quantized_resolution_times[h], kind, note_value, quantized_hold_time)
+
+    return note_tracks
+
+# Returns hit objects as OsuHitObjectColumns, which are pickled as a few arrays instead of one object per note
+def _compact_hit_objects(hit_objects):
+    if isinstance(hit_objects, OsuHitObjectColumns):
+        return hit_objects
+
+    return OsuHitObjectColumns(hit_objects)
+
+# Fills in the [Song] section of a ChartFile based off a given source OsuFile and the conversion options
+def _generate_song(chart_file, source_osu_file, resolution=96, preview_length=0, use_unicode_metadata=False, use_tags_as_genre=False):
+    if use_unicode_metadata:
+        chart_file.song["Name"] = source_osu_file.title_unicode
+        chart_file.song["Artist"] = source_osu_file.artist_unicode
+    else:
+        chart_file.song["Name"] = source_osu_file.title
+        chart_file.song["Artist"] = source_osu_file.artist
+
+    chart_file.song["Charter"] = source_osu_file.creator
+
+    chart_file.song["Offset"] = round(source_osu_file.timing_points[0].time / 1000, 3)
+    chart_file.song["Resolution"] = resolution
+    chart_file.song["Difficulty"] = floor(source_osu_file.overall_difficulty)
+
+    # preview_time is -1 when not set in the osu! editor
+    if source_osu_file.preview_time < 0:
+        chart_file.song["PreviewStart"] = 0
+    else:
+        chart_file.song["PreviewStart"] = round(source_osu_file.preview_time / 1000, 3)
+
+    # Set to 0 so the preview still plays and isn't literally a no length preview
+    if preview_length == 0:
+        chart_file.song["PreviewEnd"] = 0
+    else:
+        chart_file.song["PreviewEnd"] = chart_file.song["PreviewStart"] + preview_length
+
+    if use_tags_as_genre:
+        chart_file.song["Genre"] = source_osu_file.tags
+
+    chart_file.song["GuitarStream"] = source_osu_file.audio_filename
+
+# Parses a [Song] value of a .chart file, quoted values are strings and the rest are numbers where possible
+def _parse_song_value(value):
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return value[1:-1]
+
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+
+    return value
+
+# Adds the track objects of the lines of a track section ("tick = identifier value [length]") to an empty ChartTrack.
+# The arrays are built in one go instead of calling add() for every object, and the ticks are checked to be in order once
+def _add_track_lines(track, lines):
+    tokens = " ".join(lines).split()
+    identifiers = set(tokens[2::5])
+
+    # Note tracks written by osu2chart only have "tick = N|S value length" lines, so every column is a slice of the tokens
+    if len(tokens) == 5 * len(lines) and set(tokens[1::5]) == {"="} and identifiers <= _LENGTH_IDENTIFIERS:
+        if identifiers == {NoteTrackNote._identifier}:
+            track.kinds = array("B", bytes([_TRACK_OBJECT_KINDS[NoteTrackNote]]) * len(lines))
+        else:
+            track.kinds = array("B", [_TRACK_OBJECT_IDENTIFIERS[identifier] for identifier in tokens[2::5]])
+
+        track.ticks = array("q", map(int, tokens[0::5]))
+        track.values = array("q", map(int, tokens[3::5]))
+        track.lengths = array("q", map(int, tokens[4::5]))
     else:
-        return None
+        rows = [key.split() + ["="] + value.split() for key, _, value in (line.partition("=") for line in lines)]
+        rows = [row for row in rows if len(row) > 2 and row[2] in _TRACK_OBJECT_IDENTIFIERS]
+        kinds = [_TRACK_OBJECT_IDENTIFIERS[row[2]] for row in rows]
+
+        track.ticks = array("q", [int(row[0]) for row in rows])
+        track.kinds = array("B", kinds)
+        track.values = array("q", [int(row[3]) for row in rows])
+        track.lengths = array("q", [int(row[4]) if _TRACK_OBJECT_TYPES[kind]._has_length else 0 for row, kind in zip(rows, kinds)])
 
-    return note_track
+    track._sorted = all(map(le, track.ticks, islice(track.ticks, 1, None)))
+    track._track_objects = None
+
+# Stand-in for StageProfiler.stage when no profiler is given, the record it yields is discarded
+class _NoStage:
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc_info):
+        return False
+
+def _no_stage(stage, fname=""):
+    return _NoStage()
 
 class Chart:
     # Returns a Chart with the appropriate difficulties based off the given osu_files
     @staticmethod
-    def create_from_osu(source_osu_file, resolution=96, preview_length=0, use_unicode_metadata=False, use_tags_as_genre=False, expert=None, hard=None, medium=None, easy=None):
+    def create_from_osu(source_osu_file, resolution=96, preview_length=0, use_unicode_metadata=False, use_tags_as_genre=False, expert=None, hard=None, medium=None, easy=None, profiler=None, executor=None, exact_timing=False, snap=None):
         chart_file = ChartFile()
 
-        if use_unicode_metadata:
-            chart_file.song["Name"] = source_osu_file.title_unicode
-            chart_file.song["Artist"] = source_osu_file.artist_unicode
-        else:
-            chart_file.song["Name"] = source_osu_file.title
-            chart_file.song["Artist"] = source_osu_file.artist
+        # profiler is an optional profiling.StageProfiler, every stage is recorded with it
+        # executor is an optional concurrent.futures executor (e.g. a ProcessPoolExecutor) that generates the note tracks
+        # of every difficulty concurrently, they are still added to the chart in the same order
+        # exact_timing and snap select an ExactTickIndex, see create_tick_index
+        stage = profiler.stage if profiler is not None else _no_stage
 
-        chart_file.song["Charter"] = source_osu_file.creator
+        _generate_song(chart_file, source_osu_file, resolution, preview_length, use_unicode_metadata, use_tags_as_genre)
 
-        chart_file.song["Offset"] = round(source_osu_file.timing_points[0].time / 1000, 3)
-        chart_file.song["Resolution"] = resolution
-        chart_file.song["Difficulty"] = floor(source_osu_file.overall_difficulty)
+        with stage("sync_track", source_osu_file.version) as record:
+            # The source's TickIndex is shared with its note tracks when it is also one of the difficulties
+            source_tick_index = create_tick_index(source_osu_file.timing_points, resolution, exact_timing, snap)
 
-        # preview_time is -1 when not set in the osu! editor
-        if source_osu_file.preview_time < 0:
-            chart_file.song["PreviewStart"] = 0
-        else:
-            chart_file.song["PreviewStart"] = round(source_osu_file.preview_time / 1000, 3)
+            chart_file.sync_track = _generate_sync_track(source_osu_file.timing_points, resolution, source_tick_index)
+            chart_file.events_track = _generate_events_track(source_osu_file.timing_points, source_osu_file.bookmarks, resolution)
+            record["track_objects"] = len(chart_file.sync_track)
+
+        difficulties = [(d, f) for d, f in (("Expert", expert), ("Hard", hard), ("Medium", medium), ("Easy", easy)) if f is not None]
+
+        # Workers only receive the TickIndex and hit object columns of a difficulty, to keep pickling cheap
+        futures = {}
+        if executor is not None and len(difficulties) > 1:
+            for difficulty, osu_file in difficulties:
+                tick_index = source_tick_index if osu_file is source_osu_file else create_tick_index(osu_file.timing_points, resolution, exact_timing, snap)
+                futures[difficulty] = executor.submit(_generate_note_tracks, difficulty, None, _compact_hit_objects(osu_file.hit_objects), osu_file.key_count, resolution, tick_index)
+
+        for difficulty, osu_file in difficulties:
+            # With an executor, the stage only records the time spent waiting for the result
+            with stage(f"note_tracks:{difficulty}", osu_file.version) as record:
+                if difficulty in futures:
+                    note_tracks = futures[difficulty].result()
+                else:
+                    tick_index = source_tick_index if osu_file is source_osu_file else create_tick_index(osu_file.timing_points, resolution, exact_timing, snap)
+                    note_tracks = _generate_note_tracks(difficulty, osu_file.timing_points, osu_file.hit_objects, osu_file.key_count, resolution, tick_index)
 
-        # Set to 0 so the preview still plays and isn't literally a no length preview
-        if preview_length == 0:
-            chart_file.song["PreviewEnd"] = 0
+                chart_file.note_tracks.extend(note_tracks)
+                record["hit_objects"] = len(osu_file.hit_objects)
+                record["track_objects"] = sum(len(note_track) for note_track in note_tracks)
+
+        return chart_file
+
+    # Create a ChartFile from a given path to a .chart file
+    # Returns a ChartFile, or None if the .chart file did not exist
+    @staticmethod
+    def create_from_path(fname):
+        if exists(fname) and fname[-6:] == ".chart":
+            with open(fname, "r", encoding="utf-8-sig") as file:
+                return Chart.create_from_lines(file)
         else:
-            chart_file.song["PreviewEnd"] = chart_file.song["PreviewStart"] + preview_length
-
-        if use_tags_as_genre:
-            chart_file.song["Genre"] = source_osu_file.tags
-
-        chart_file.song["GuitarStream"] = source_osu_file.audio_filename
-
-        chart_file.sync_track = _generate_sync_track(source_osu_file.timing_points, chart_file.song["Resolution"])
-        chart_file.events_track = _generate_events_track(source_osu_file.timing_points, source_osu_file.bookmarks, chart_file.song["Resolution"])
-
-        if expert is not None:
-            chart_file.note_tracks.append(_generate_note_track("ExpertSingle", expert.timing_points, expert.hit_objects, expert.key_count, False, chart_file.song["Resolution"]))
-            if expert.key_count > 9:
-                chart_file.note_tracks.append(_generate_note_track("ExpertDoubleGuitar", expert.timing_points, expert.hit_objects, expert.key_count, True, chart_file.song["Resolution"]))
-        if hard is not None:
-            chart_file.note_tracks.append(_generate_note_track("HardSingle", hard.timing_points, hard.hit_objects, hard.key_count, False, chart_file.song["Resolution"]))
-            if hard.key_count > 9:
-                chart_file.note_tracks.append(_generate_note_track("HardDoubleGuitar", hard.timing_points, hard.hit_objects, hard.key_count, True, chart_file.song["Resolution"]))
-        if medium is not None:
-            chart_file.note_tracks.append(_generate_note_track("MediumSingle", medium.timing_points, medium.hit_objects, medium.key_count, False, chart_file.song["Resolution"]))
-            if medium.key_count > 9:
-                chart_file.note_tracks.append(_generate_note_track("MediumDoubleGuitar", medium.timing_points, medium.hit_objects, medium.key_count, True, chart_file.song["Resolution"]))
-        if easy is not None:
-            chart_file.note_tracks.append(_generate_note_track("EasySingle", easy.timing_points, easy.hit_objects, easy.key_count, False, chart_file.song["Resolution"]))
-            if easy.key_count > 9:
-                chart_file.note_tracks.append(_generate_note_track("EasyDoubleGuitar", easy.timing_points, easy.hit_objects, easy.key_count, True, chart_file.song["Resolution"]))
-
-        return chart_file
\ No newline at end of file
+            return None
+
+    # Create a ChartFile from an iterable of lines of a .chart file (e.g. an open file)
+    # The [SyncTrack] and [Events] sections become the sync_track and events_track, and every other section a note track.
+    # The lines of a track section are collected and added to its track at once, see _add_track_lines.
+    # Track objects that are not written by osu2chart (e.g. events, anchors, and the denominator of TS) are skipped
+    @staticmethod
+    def create_from_lines(lines):
+        chart_file = ChartFile()
+
+        song = False
+        track = None
+        track_lines = []
+
+        for line in lines:
+            line = line.strip()
+
+            if line == "" or line == "{" or line == "}":
+                continue
+
+            if line[0] == "[" and line[-1] == "]":
+                if track is not None:
+                    _add_track_lines(track, track_lines)
+                    track_lines = []
+
+                section = line[1:-1]
+                song = section == "Song"
+                track = None
+
+                if not song:
+                    track = ChartTrack(section, chart_file.song["Resolution"])
+
+                    if section == "SyncTrack":
+                        chart_file.sync_track = track
+                    elif section == "Events":
+                        chart_file.events_track = track
+                    else:
+                        chart_file.note_tracks.append(track)
+
+                continue
+
+            if track is not None:
+                track_lines.append(line)
+            elif song:
+                key, _, value = line.partition("=")
+                chart_file.song[key.strip()] = _parse_song_value(value.strip())
+
+        if track is not None:
+            _add_track_lines(track, track_lines)
+
+        return chart_file
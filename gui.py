@@ -0,0 +1,421 @@
+"""
+gui.py
+
+The Tk window of osu2chart, started by osu2chart.pyw.
+The converter modules never import this module, so they can be used without tkinter.
+"""
+
+import tkinter as tk
+from tkinter import filedialog, messagebox
+import tkinter.ttk as ttk
+
+import queue
+import threading
+from os.path import dirname, exists
+
+from osu import Osu, OsuFile
+from chart import Chart
+from package import export_package
+
+# Raised inside convert_in_background to stop a conversion that was cancelled
+class _ConversionCancelled(Exception):
+    pass
+
+# Converts the given .osu files into chart_fname, meant to be run on a worker thread
+# The difficulties are parsed and their note tracks generated concurrently in separate processes,
+# then the chart is exported as a song folder along with song.ini and the audio (see package.py)
+# Progress is reported by putting messages on the messages queue:
+#   ("progress", percentage, status text)
+#   ("done", message) / ("failed", message) / ("cancelled", message)
+# cancel_event is checked after every parsed file and before and after the chart is generated, once the files are written it is done
+# If a StageProfiler is given, every stage of the conversion is recorded with it
+def convert_in_background(osu_paths, options, chart_fname, cancel_event, messages, profiler=None):
+    # Imported on the first conversion instead of while the window opens
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    try:
+        osu_file = dict.fromkeys(osu_paths)
+
+        messages.put(("progress", 0, "Parsing .osu files..."))
+
+        with ProcessPoolExecutor(max_workers=max(1, sum(1 for p in osu_paths.values() if p != ""))) as executor:
+            if profiler is None:
+                futures = {executor.submit(Osu.create_from_path, path, columnar=True): difficulty for difficulty, path in osu_paths.items() if path != ""}
+            else:
+                from profiling import create_from_path_profiled
+
+                futures = {executor.submit(create_from_path_profiled, path, profiler.trace_allocations, columnar=True): difficulty for difficulty, path in osu_paths.items() if path != ""}
+
+            for parsed, future in enumerate(as_completed(futures), start=1):
+                if cancel_event.is_set():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    messages.put(("cancelled", "Conversion cancelled."))
+                    return
+
+                if profiler is None:
+                    osu_file[futures[future]] = future.result()
+                else:
+                    osu_file[futures[future]], records = future.result()
+                    for record in records:
+                        profiler.add_record(record)
+
+                messages.put(("progress", 60 * parsed / len(futures), f"Parsed {parsed} of {len(futures)} .osu files"))
+
+            # The parser returns None for other game modes without saying why, batch.py reports these as skipped instead
+            for difficulty, path in osu_paths.items():
+                if osu_file[difficulty] is None and path != "" and exists(path):
+                    print("Not a valid osu!mania map.")
+
+            # Same as before, the first existing difficulty (easiest first) is used as the source
+            source = next((d for d in osu_file if type(osu_file[d]) is OsuFile), None)
+            if source is None:
+                messages.put(("failed", "Failed to convert!\nPlease check the path(s) to your .osu file(s)."))
+                return
+
+            if cancel_event.is_set():
+                messages.put(("cancelled", "Conversion cancelled."))
+                return
+
+            # The note tracks of every difficulty are generated concurrently on the same worker processes,
+            # while the audio (and background / video) is copied to the save directory
+            messages.put(("progress", 60, "Generating chart and copying audio..."))
+            # Generating can take a while, so cancelling is checked again before notes.chart and song.ini are written.
+            # The media copies that already started are finished by export_package
+            def create_chart():
+                chart_file = Chart.create_from_osu(osu_file[source],
+                    resolution=options["resolution"],
+                    preview_length=options["preview_length"],
+                    use_unicode_metadata=options["use_unicode_metadata"],
+                    use_tags_as_genre=options["use_tags_as_genre"],
+                    expert=osu_file["expert"],
+                    hard=osu_file["hard"],
+                    medium=osu_file["medium"],
+                    easy=osu_file["easy"],
+                    profiler=profiler,
+                    executor=executor)
+
+                if cancel_event.is_set():
+                    raise _ConversionCancelled()
+
+                return chart_file
+
+            if profiler is None:
+                export_package(create_chart, osu_file[source], dirname(osu_paths[source]), dirname(chart_fname), options["include_background"])
+            else:
+                with profiler.stage("package", dirname(chart_fname)):
+                    export_package(create_chart, osu_file[source], dirname(osu_paths[source]), dirname(chart_fname), options["include_background"])
+
+        messages.put(("progress", 100, "Done"))
+        messages.put(("done", "Conversion complete!"))
+    except _ConversionCancelled:
+        messages.put(("cancelled", "Conversion cancelled."))
+    except Exception as e:
+        messages.put(("failed", f"Failed to convert!\n{e!r}"))
+
+# Template code generated in Pygubu Designer
+class Osu2ChartApp:
+    # If profile_fname is given, every conversion is profiled and written to it, see batch.py --profile
+    def __init__(self, master=None, profile_fname=None):
+        self.profile_fname = profile_fname
+
+        # Root window
+        self.top_main_frame = tk.Tk() if master is None else tk.Toplevel(master)
+        self.top_main_frame.configure(height=320, padx=8, pady=8, width=480)
+        self.top_main_frame.geometry("480x392")
+        self.top_main_frame.minsize(328, 392)
+        self.top_main_frame.resizable(True, False)
+        self.top_main_frame.title("osu2chart")
+
+        # Control variables
+        self._easy_path = tk.StringVar()
+        self._medium_path = tk.StringVar()
+        self._hard_path = tk.StringVar()
+        self._expert_path = tk.StringVar()
+
+        self._include_bg = tk.IntVar(value=1)
+        self._use_unicode_metadata = tk.IntVar(value=0)
+        self._use_tags_as_genre = tk.IntVar(value=0)
+
+        self._preview_length = tk.DoubleVar(value=0.0)
+        self._resolution = tk.IntVar(value=96)
+
+        self._save_path = tk.StringVar()
+
+        self._progress = tk.DoubleVar(value=0.0)
+        self._status = tk.StringVar()
+
+        # State of the background conversion
+        self._conversion_thread = None
+        self._conversion_profiler = None
+        self._conversion_cprofile = None
+        self._conversion_messages = queue.Queue()
+        self._cancel_conversion = threading.Event()
+
+        # UI
+        self.lbf_difficulties = ttk.Labelframe(self.top_main_frame)
+        self.lbf_difficulties.configure(
+            height=200, padding="4 4 4 4", text=".osu files"
+        )
+
+        self.lbl_easy = ttk.Label(self.lbf_difficulties)
+        self.lbl_easy.configure(text="Easy")
+        self.lbl_easy.grid(column=0, padx=4, row=0, sticky="e")
+
+        self.ent_easy = ttk.Entry(self.lbf_difficulties, textvariable=self._easy_path)
+        self.ent_easy.configure(width=9999)
+        self.ent_easy.grid(column=1, columnspan=1, row=0)
+
+        self.btn_easy = ttk.Button(self.lbf_difficulties, command=lambda: self.ask_for_osu_file(self._easy_path))
+        self.btn_easy.configure(text="...", width=3)
+        self.btn_easy.grid(column=2, row=0, sticky="w")
+
+        self.lbl_medium = ttk.Label(self.lbf_difficulties)
+        self.lbl_medium.configure(text="Medium")
+        self.lbl_medium.grid(column=0, padx=4, row=1, sticky="e")
+
+        self.lbl_hard = ttk.Label(self.lbf_difficulties)
+        self.lbl_hard.configure(text="Hard")
+        self.lbl_hard.grid(column=0, padx=4, row=2, sticky="e")
+
+        self.lbl_expert = ttk.Label(self.lbf_difficulties)
+        self.lbl_expert.configure(text="Expert")
+        self.lbl_expert.grid(column=0, padx=4, row=3, sticky="e")
+
+        self.ent_medium = ttk.Entry(self.lbf_difficulties, textvariable=self._medium_path)
+        self.ent_medium.configure(width=9999)
+        self.ent_medium.grid(column=1, row=1)
+
+        self.ent_hard = ttk.Entry(self.lbf_difficulties, textvariable=self._hard_path)
+        self.ent_hard.configure(width=9999)
+        self.ent_hard.grid(column=1, row=2)
+
+        self.ent_expert = ttk.Entry(self.lbf_difficulties, textvariable=self._expert_path)
+        self.ent_expert.configure(width=9999)
+        self.ent_expert.grid(column=1, row=3)
+
+        self.btn_medium = ttk.Button(self.lbf_difficulties, command=lambda: self.ask_for_osu_file(self._medium_path))
+        self.btn_medium.configure(text="...", width=3)
+        self.btn_medium.grid(column=2, row=1, sticky="w")
+
+        self.btn_hard = ttk.Button(self.lbf_difficulties, command=lambda: self.ask_for_osu_file(self._hard_path))
+        self.btn_hard.configure(text="...", width=3)
+        self.btn_hard.grid(column=2, row=2, sticky="w")
+
+        self.btn_expert = ttk.Button(self.lbf_difficulties, command=lambda: self.ask_for_osu_file(self._expert_path))
+        self.btn_expert.configure(text="...", width=3)
+        self.btn_expert.grid(column=2, row=3, sticky="w")
+
+        self.lbf_difficulties.pack(fill="x", side="top")
+        self.lbf_difficulties.grid_anchor("center")
+        self.lbf_difficulties.columnconfigure(0, minsize=56, weight=1)
+        self.lbf_difficulties.columnconfigure(1, minsize=200, weight=8)
+        self.lbf_difficulties.columnconfigure(2, minsize=29, weight=1)
+
+        self.lbf_options = ttk.Labelframe(self.top_main_frame)
+        self.lbf_options.configure(height=200, padding="4 4 4 4", text="Options")
+
+        self.chk_unicode = ttk.Checkbutton(self.lbf_options, variable=self._use_unicode_metadata)
+        self.chk_unicode.configure(text="Use unicode metadata")
+        self.chk_unicode.grid(column=0, columnspan=2, row=0, sticky="n")
+
+        self.lbl_preview_length = ttk.Label(self.lbf_options)
+        self.lbl_preview_length.configure(
+            padding="0 0 4 0", text="Preview length (in seconds)"
+        )
+        self.lbl_preview_length.grid(column=0, row=3, sticky="e")
+
+        self.lbl_resolution = ttk.Label(self.lbf_options)
+        self.lbl_resolution.configure(padding="0 0 4 0", text="Resolution")
+        self.lbl_resolution.grid(column=0, row=4, sticky="e")
+
+        self.spb_preview_length = ttk.Spinbox(self.lbf_options, textvariable=self._preview_length)
+        self.spb_preview_length.configure(from_=0, increment=0.5, to=999, wrap="false")
+        self.spb_preview_length.set(0)
+        self.spb_preview_length.grid(column=1, row=3)
+
+        self.spb_resolution = ttk.Spinbox(self.lbf_options, textvariable=self._resolution)
+        self.spb_resolution.configure(from_=96, increment=1, to=480, wrap="false")
+        self.spb_resolution.set(96)
+        self.spb_resolution.grid(column=1, row=4)
+
+        self.chk_tags_as_genre = ttk.Checkbutton(self.lbf_options, variable=self._use_tags_as_genre)
+        self.chk_tags_as_genre.configure(text="Use tags as genre")
+        self.chk_tags_as_genre.grid(column=0, columnspan=2, row=1, sticky="n")
+
+        # Copied as background.<ext> and video.<ext>, which Clone Hero shows behind the highway
+        self.chk_include_bg = ttk.Checkbutton(self.lbf_options, variable=self._include_bg)
+        self.chk_include_bg.configure(text="Include background / video")
+        self.chk_include_bg.grid(column=0, columnspan=2, row=2, sticky="n")
+
+        self.lbf_options.pack(fill="x", side="top")
+        self.lbf_options.grid_anchor("center")
+        self.lbf_options.rowconfigure("all", pad=4)
+
+        self.frm_convert = ttk.Frame(self.top_main_frame)
+        self.frm_convert.configure(height=200, padding="4 12 4 4", width=200)
+
+        self.lbl_save_directory = ttk.Label(self.frm_convert)
+        self.lbl_save_directory.configure(text="Save directory")
+        self.lbl_save_directory.grid(column=0, padx=4, row=0, sticky="e")
+
+        self.ent_save_directory = ttk.Entry(self.frm_convert, textvariable=self._save_path)
+        self.ent_save_directory.configure(width=9999)
+        self.ent_save_directory.grid(column=1, row=0, pady=4)
+
+        self.btn_save_directory = ttk.Button(self.frm_convert, command=lambda: self.ask_for_save_directory(self._save_path))
+        self.btn_save_directory.configure(text="...", width=3)
+        self.btn_save_directory.grid(column=2, row=0)
+
+        self.frm_buttons = ttk.Frame(self.frm_convert)
+        self.frm_buttons.grid(column=0, columnspan=3, row=1)
+
+        self.btn_convert = ttk.Button(self.frm_buttons, command=self.convert)
+        self.btn_convert.configure(text="Convert")
+        self.btn_convert.grid(column=0, padx=2, row=0)
+
+        self.btn_cancel = ttk.Button(self.frm_buttons, command=self.cancel)
+        self.btn_cancel.configure(text="Cancel", state="disabled")
+        self.btn_cancel.grid(column=1, padx=2, row=0)
+
+        self.pgb_progress = ttk.Progressbar(self.frm_convert, variable=self._progress, maximum=100)
+        self.pgb_progress.grid(column=0, columnspan=3, row=2, pady=4, sticky="ew")
+
+        self.lbl_status = ttk.Label(self.frm_convert, textvariable=self._status)
+        self.lbl_status.grid(column=0, columnspan=3, row=3)
+
+        self.frm_convert.pack(fill="x", side="top")
+        self.frm_convert.grid_anchor("center")
+        self.frm_convert.columnconfigure(0, minsize=86, weight=1)
+        self.frm_convert.columnconfigure(1, minsize=200, weight=8)
+        self.frm_convert.columnconfigure(2, minsize=29, weight=1)
+
+        # Main widget
+        self.mainwindow = self.top_main_frame
+
+    def ask_for_osu_file(self, entry_variable):
+        osu_fname = filedialog.askopenfilename(title="Please select a .osu file", filetypes=[("osu! file", "*.osu")])
+
+        if osu_fname != "":
+            entry_variable.set(osu_fname)
+
+    def ask_for_save_directory(self, entry_variable):
+        save_directory = filedialog.askdirectory(title="Please select a directory for the resulting audio/chart file")
+
+        if save_directory != "":
+            entry_variable.set(save_directory)
+
+    def convert(self):
+        if self._conversion_thread is not None:
+            return
+
+        if self._save_path.get() == "":
+            messagebox.showerror(title="osu2chart", message="Please set the save directory.")
+            return
+
+        if self._resolution.get() <= 0:
+            messagebox.showerror(title="osu2chart", message="Resolution must be greater than 0.")
+            return
+
+        if self._preview_length.get() < 0:
+            messagebox.showerror(title="osu2chart", message="Preview length cannot be a negative number.")
+            return
+
+        chart_fname = self._save_path.get() + "/notes.chart"
+        if exists(chart_fname):
+            if not messagebox.askyesno(title="osu2chart", message="A chart already exists in this directory.\nProceed with the conversion and overwrite the file?"):
+                messagebox.showwarning(title="osu2chart", message="Conversion aborted.")
+                return
+
+        osu_paths = {
+            "easy": self._easy_path.get(),
+            "medium": self._medium_path.get(),
+            "hard": self._hard_path.get(),
+            "expert": self._expert_path.get()
+        }
+
+        options = {
+            "resolution": self._resolution.get(),
+            "preview_length": self._preview_length.get(),
+            "use_unicode_metadata": self._use_unicode_metadata.get(),
+            "use_tags_as_genre": self._use_tags_as_genre.get(),
+            "include_background": self._include_bg.get()
+        }
+
+        # Run the conversion on a worker thread so the window stays responsive,
+        # its progress is picked up by _poll_conversion on the Tk main thread
+        self._cancel_conversion.clear()
+        args = (osu_paths, options, chart_fname, self._cancel_conversion, self._conversion_messages)
+
+        if self.profile_fname is None:
+            self._conversion_thread = threading.Thread(target=convert_in_background, args=args, daemon=True)
+            self._conversion_thread.start()
+        else:
+            self._start_profiled_conversion(args)
+
+        self.btn_convert.configure(state="disabled")
+        self.btn_cancel.configure(state="normal")
+        self._poll_conversion()
+
+    # Same as starting convert_in_background, but the conversion is profiled, see _write_profile
+    def _start_profiled_conversion(self, args):
+        from profiling import StageProfiler, is_pstats_fname
+
+        if is_pstats_fname(self.profile_fname):
+            import cProfile
+
+            # cProfile only profiles the thread it runs on, the parsing processes are not included
+            self._conversion_cprofile = cProfile.Profile()
+            self._conversion_thread = threading.Thread(target=self._conversion_cprofile.runcall, args=(convert_in_background,) + args, daemon=True)
+        else:
+            self._conversion_profiler = StageProfiler()
+            self._conversion_thread = threading.Thread(target=convert_in_background, args=args + (self._conversion_profiler,), daemon=True)
+        self._conversion_thread.start()
+
+    def cancel(self):
+        self._cancel_conversion.set()
+        self.btn_cancel.configure(state="disabled")
+        self._status.set("Cancelling...")
+
+    def _poll_conversion(self):
+        while True:
+            try:
+                message = self._conversion_messages.get_nowait()
+            except queue.Empty:
+                break
+
+            if message[0] == "progress":
+                self._progress.set(message[1])
+                self._status.set(message[2])
+                continue
+
+            # The conversion finished
+            self._conversion_thread = None
+            self.btn_convert.configure(state="normal")
+            self.btn_cancel.configure(state="disabled")
+            self._status.set("")
+
+            if message[0] == "done":
+                self._write_profile()
+                messagebox.showinfo(title="osu2chart", message=message[1])
+            elif message[0] == "cancelled":
+                self._progress.set(0)
+                messagebox.showwarning(title="osu2chart", message=message[1])
+            else:
+                self._progress.set(0)
+                messagebox.showerror(title="osu2chart", message=message[1])
+            return
+
+        self.mainwindow.after(50, self._poll_conversion)
+
+    # Writes the profile of the last conversion to profile_fname, if there is one
+    def _write_profile(self):
+        if self._conversion_cprofile is not None:
+            self._conversion_cprofile.dump_stats(self.profile_fname)
+        elif self._conversion_profiler is not None:
+            self._conversion_profiler.dump_json(self.profile_fname)
+
+        self._conversion_cprofile = None
+        self._conversion_profiler = None
+
+    def run(self):
+        self.mainwindow.mainloop()
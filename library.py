@@ -0,0 +1,182 @@
+"""
+library.py
+
+Indexes the osu!mania difficulties of an osu! Songs folder in a SQLite database.
+Only the [General], [Editor], [Metadata] and [Difficulty] sections of every .osu file are read,
+and a rescan only reads the files that were added or changed since the last one.
+
+Usage: python library.py <songs directory> <index database> [--keys N] [--difficulties N] [options]
+"""
+
+import argparse
+import mmap
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from osu import LazyOsuFile
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS beatmaps (
+    path TEXT PRIMARY KEY,
+    set_dir TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mode INTEGER NOT NULL,
+    key_count INTEGER NOT NULL,
+    overall_difficulty REAL NOT NULL,
+    version TEXT NOT NULL,
+    title TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    creator TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS beatmaps_set_dir ON beatmaps (set_dir);
+CREATE INDEX IF NOT EXISTS beatmaps_mode_key_count ON beatmaps (mode, key_count);
+"""
+
+# Columns read from the headers of a .osu file, in the order of the beatmaps table
+_HEADER_COLUMNS = ("mode", "key_count", "overall_difficulty", "version", "title", "artist", "creator")
+
+# Returns the header values of a .osu file (see _HEADER_COLUMNS), or None if it can't be read
+# Non-mania maps are indexed as well, so they are not read again on the next scan
+def read_headers(fname):
+    try:
+        with open(fname, "rb") as file:
+            osu_file = LazyOsuFile(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, ValueError):
+        # ValueError: empty files can't be memory-mapped
+        return None
+
+    try:
+        return tuple(getattr(osu_file, column) for column in _HEADER_COLUMNS)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    finally:
+        osu_file.close()
+
+# Returns a dict of path -> (set directory, mtime, size) for every .osu file under songs_dir
+def find_osu_files(songs_dir):
+    osu_files = {}
+
+    for directory, _, files in os.walk(songs_dir):
+        for f in files:
+            if f[-4:] == ".osu":
+                path = os.path.join(directory, f)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                osu_files[path] = (directory, stat.st_mtime_ns, stat.st_size)
+
+    return osu_files
+
+class LibraryIndex:
+    def __init__(self, fname):
+        self.connection = sqlite3.connect(fname)
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    # Brings the index up to date with songs_dir, the headers of new and changed files are read on a thread pool
+    # Files under songs_dir that no longer exist are removed from the index
+    # Returns a (read, unchanged, removed) tuple with the number of files in each case
+    def scan(self, songs_dir, workers=8):
+        songs_dir = os.path.abspath(songs_dir)
+        osu_files = find_osu_files(songs_dir)
+
+        prefix = os.path.join(songs_dir, "")
+        indexed = {path: (mtime_ns, size) for path, mtime_ns, size in self.connection.execute(
+            "SELECT path, mtime_ns, size FROM beatmaps WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))}
+
+        changed = [path for path, (_, mtime_ns, size) in osu_files.items() if indexed.get(path) != (mtime_ns, size)]
+        removed = [path for path in indexed if path not in osu_files]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            rows = []
+            for path, headers in zip(changed, executor.map(read_headers, changed)):
+                if headers is not None:
+                    set_dir, mtime_ns, size = osu_files[path]
+                    rows.append((path, set_dir, mtime_ns, size) + headers)
+                else:
+                    removed.append(path)
+
+        with self.connection:
+            self.connection.executemany("DELETE FROM beatmaps WHERE path = ?", ((path,) for path in removed))
+            self.connection.executemany(f"INSERT OR REPLACE INTO beatmaps VALUES ({', '.join('?' * (4 + len(_HEADER_COLUMNS)))})", rows)
+
+        return (len(changed), len(osu_files) - len(changed), len(removed))
+
+    # Returns a list of (set directory, [.osu paths]) of the osu!mania beatmap sets in the index,
+    # in the same form as batch.find_beatmap_sets
+    # If key_count is given, only difficulties with that key count are included
+    # If min_difficulties/max_difficulties are given, only sets with that many included difficulties are returned
+    # If songs_dir is given, only beatmaps inside it are included, as the index may hold several Songs folders
+    def find_sets(self, key_count=None, min_difficulties=None, max_difficulties=None, songs_dir=None):
+        query = "SELECT set_dir, path FROM beatmaps WHERE mode = 3"
+        parameters = []
+        if songs_dir is not None:
+            prefix = os.path.join(os.path.abspath(songs_dir), "")
+            query += " AND substr(path, 1, ?) = ?"
+            parameters += [len(prefix), prefix]
+        if key_count is not None:
+            query += " AND key_count = ?"
+            parameters.append(key_count)
+        query += " ORDER BY set_dir, path"
+
+        beatmap_sets = []
+        for set_dir, path in self.connection.execute(query, parameters):
+            if len(beatmap_sets) == 0 or beatmap_sets[-1][0] != set_dir:
+                beatmap_sets.append((set_dir, []))
+            beatmap_sets[-1][1].append(path)
+
+        return [(set_dir, paths) for set_dir, paths in beatmap_sets
+            if (min_difficulties is None or len(paths) >= min_difficulties) and (max_difficulties is None or len(paths) <= max_difficulties)]
+
+    # Returns the indexed header values of a .osu file as a dict, or None if it isn't indexed
+    def get(self, path):
+        cursor = self.connection.execute("SELECT * FROM beatmaps WHERE path = ?", (path,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+
+        return dict(zip((column[0] for column in cursor.description), row))
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Index the osu!mania beatmaps of an osu! Songs folder and list the matching beatmap sets.")
+    parser.add_argument("songs_dir", help="osu! Songs directory (or any directory containing beatmap set folders)")
+    parser.add_argument("index", help="SQLite database to store the index in, created if it doesn't exist")
+    parser.add_argument("-j", "--workers", type=int, default=8, help="number of threads reading .osu files (default: 8)")
+    parser.add_argument("--no-scan", action="store_true", help="only query the index, without scanning songs_dir for changes")
+    parser.add_argument("-k", "--keys", type=int, help="only list difficulties with this key count")
+    parser.add_argument("-d", "--difficulties", type=int, help="only list sets with exactly this many (matching) difficulties")
+    parser.add_argument("--min-difficulties", type=int, help="only list sets with at least this many (matching) difficulties")
+
+    args = parser.parse_args(argv)
+
+    if args.workers <= 0:
+        parser.error("--workers must be greater than 0")
+
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    index = LibraryIndex(args.index)
+
+    if not args.no_scan:
+        start_time = time.perf_counter()
+        read, unchanged, removed = index.scan(args.songs_dir, args.workers)
+        print(f"Indexed {read} new or changed .osu files in {time.perf_counter() - start_time:.2f}s ({unchanged} unchanged, {removed} removed)", file=sys.stderr)
+
+    min_difficulties = args.difficulties if args.difficulties is not None else args.min_difficulties
+    for set_dir, paths in index.find_sets(args.keys, min_difficulties, args.difficulties, args.songs_dir):
+        print(f"{set_dir}\t{len(paths)}")
+
+    index.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
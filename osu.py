@@ -1,8 +1,10 @@
-import copy
+import os
+from array import array
 from os.path import exists
-from configparser import ConfigParser, DuplicateOptionError
 
 class OsuTimingPoint:
+    __slots__ = ("time", "beat_length", "meter", "sample_set", "sample_index", "volume", "uninherited", "effects")
+
     def __init__(self, time, beat_length, meter, sample_set, sample_index, volume, uninherited, effects):
         self.time = time
         self.beat_length = beat_length
@@ -16,7 +18,13 @@ class OsuTimingPoint:
     def __str__(self):
         return f"{self.time},{self.beat_length},{self.meter},{self.sample_set},{self.sample_index},{self.volume},{self.uninherited},{self.effects}"
 
+    # Returns a copy of the timing point moved to time
+    def moved_to(self, time):
+        return OsuTimingPoint(time, self.beat_length, self.meter, self.sample_set, self.sample_index, self.volume, self.uninherited, self.effects)
+
 class OsuHitObject:
+    __slots__ = ("x", "time", "type", "end_time")
+
     def __init__(self, x, time, type, end_time):
         self.x = x
         self.time = time
@@ -26,6 +34,111 @@ class OsuHitObject:
     def __str__(self):
         return f"{self.x},{self.time},{self.type},{self.end_time}"
 
+# Base class for the array-backed, columnar storage of OsuTimingPoints and OsuHitObjects
+#
+# Behaves like a list of the row type, but every item is created on access from the columns,
+# so changing an attribute of an item does not change the stored row.
+# The converter reads the columns directly without creating any objects.
+# Every column is an array.array, so with NumPy installed it can be wrapped
+# without copying using numpy.frombuffer(column, dtype=column.typecode)
+class _OsuColumns:
+    _row_type = None
+    _columns = ()
+
+    def __init__(self, rows=()):
+        for name, typecode in self._columns:
+            setattr(self, name, array(typecode))
+
+        for row in rows:
+            self.append(row)
+
+    def _row(self, index):
+        return self._row_type(*(getattr(self, name)[index] for name, _ in self._columns))
+
+    # Appends a row from its column values, in the order of the row type's __init__ arguments
+    def append_values(self, *values):
+        for (name, _), value in zip(self._columns, values):
+            getattr(self, name).append(value)
+
+    def append(self, row):
+        self.append_values(*(getattr(row, name) for name, _ in self._columns))
+
+    def insert(self, index, row):
+        for name, _ in self._columns:
+            getattr(self, name).insert(index, getattr(row, name))
+
+    def __len__(self):
+        return len(getattr(self, self._columns[0][0]))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"{type(self).__name__} index out of range")
+
+        return self._row(index)
+
+    def __iter__(self):
+        return map(self._row_type, *(getattr(self, name) for name, _ in self._columns))
+
+class OsuTimingPointColumns(_OsuColumns):
+    _row_type = OsuTimingPoint
+    _columns = (
+        ("time", "i"),
+        ("beat_length", "d"),
+        ("meter", "i"),
+        ("sample_set", "i"),
+        ("sample_index", "i"),
+        ("volume", "i"),
+        ("uninherited", "b"),
+        ("effects", "i")
+    )
+
+    def _row(self, index):
+        timing_point = super()._row(index)
+        timing_point.uninherited = bool(timing_point.uninherited)
+        return timing_point
+
+    def __iter__(self):
+        for timing_point in super().__iter__():
+            timing_point.uninherited = bool(timing_point.uninherited)
+            yield timing_point
+
+class OsuHitObjectColumns(_OsuColumns):
+    _row_type = OsuHitObject
+    _columns = (
+        ("x", "i"),
+        ("time", "i"),
+        ("type", "i"),
+        ("end_time", "i")
+    )
+
+    # Unrolled version of _OsuColumns.append_values, as this is called for every row of [HitObjects]
+    def append_values(self, x, time, type, end_time):
+        self.x.append(x)
+        self.time.append(time)
+        self.type.append(type)
+        self.end_time.append(end_time)
+
+# Returns the (time, beat_length, meter) columns of a list of OsuTimingPoints,
+# without creating any objects if they are already stored as OsuTimingPointColumns
+def timing_point_columns(timing_points):
+    if isinstance(timing_points, OsuTimingPointColumns):
+        return timing_points.time, timing_points.beat_length, timing_points.meter
+
+    return [t.time for t in timing_points], [t.beat_length for t in timing_points], [t.meter for t in timing_points]
+
+# Returns the (x, time, type, end_time) columns of a list of OsuHitObjects,
+# without creating any objects if they are already stored as OsuHitObjectColumns
+def hit_object_columns(hit_objects):
+    if isinstance(hit_objects, OsuHitObjectColumns):
+        return hit_objects.x, hit_objects.time, hit_objects.type, hit_objects.end_time
+
+    return [h.x for h in hit_objects], [h.time for h in hit_objects], [h.type for h in hit_objects], [h.end_time for h in hit_objects]
+
 class OsuFile:
     def __init__(self):
         self.audio_filename = ""
@@ -48,96 +161,360 @@ class OsuFile:
         self.key_count = 0
         self.overall_difficulty = 0
 
+        self.background_filename = ""
+        self.video_filename = ""
+        self.video_offset = 0
+
         self.timing_points = []
         self.hit_objects = []
 
+# Parsers for the "Key: value" sections of a .osu file
+# Maps each key that is used by the converter to its OsuFile attribute and a function to convert the value
+def _parse_bookmarks(value):
+    return [int(x) for x in value.split(",") if x.strip() != ""]
+
+_KEY_VALUE_SECTIONS = {
+    "General": {
+        "AudioFilename": ("audio_filename", str),
+        "AudioLeadIn": ("audio_lead_in", int),
+        "PreviewTime": ("preview_time", int),
+        "Mode": ("mode", int),
+        "SpecialStyle": ("special_style", int)
+    },
+    "Editor": {
+        "Bookmarks": ("bookmarks", _parse_bookmarks)
+    },
+    "Metadata": {
+        "Title": ("title", str),
+        "TitleUnicode": ("title_unicode", str),
+        "Artist": ("artist", str),
+        "ArtistUnicode": ("artist_unicode", str),
+        "Creator": ("creator", str),
+        "Version": ("version", str),
+        "Source": ("source", str),
+        "Tags": ("tags", str)
+    },
+    "Difficulty": {
+        "CircleSize": ("key_count", int),
+        "OverallDifficulty": ("overall_difficulty", float)
+    }
+}
+
+# Parses a single [TimingPoints] row into the OsuTimingPoint argument values
+# Returns None for inherited points (SVs) as only uninherited points are used
+def _parse_timing_point(line):
+    parsed_timing_point = line.split(",")
+
+    if parsed_timing_point[6] == "1":
+        return (
+            # very rarely the editor will spit out floating point time values, so double cast to be safe
+            int(float(parsed_timing_point[0])), # time
+            float(parsed_timing_point[1]),      # beat_length
+            int(parsed_timing_point[2]),        # meter
+            int(parsed_timing_point[3]),        # sample_set
+            int(parsed_timing_point[4]),        # sample_index
+            int(parsed_timing_point[5]),        # volume
+            True,                               # uninherited
+            int(parsed_timing_point[7])         # effects
+        )
+
+    return None
+
+# Parses a single [HitObjects] row into the OsuHitObject argument values
+def _parse_hit_object(line):
+    parsed_hit_object = line.split(",", 5)
+    type = int(parsed_hit_object[3])
+    end_time = 0
+
+    # osu!mania hold notes are formatted with an extra field
+    # for the end_time of the note which doesn't exist otherwise
+    if type & 128:
+        end_time = int(parsed_hit_object[5].split(":", 1)[0])
+
+    return (int(parsed_hit_object[0]), int(parsed_hit_object[2]), type, end_time)
+
+# Parses a single [Events] row into (attribute, value) pairs for the background and video events,
+# the file name is always the last pair. Returns None for any other event, e.g. breaks and storyboard commands
+def _parse_event(line):
+    # Check the event type before splitting, as storyboards can have hundreds of thousands of rows
+    if line[:2] == "0,":
+        parsed_event = line.split(",", 4)
+        return (("background_filename", parsed_event[2].strip('"')),)
+
+    if line[:2] == "1," or line[:6] == "Video,":
+        parsed_event = line.split(",", 3)
+        return (("video_offset", int(parsed_event[1])), ("video_filename", parsed_event[2].strip('"')))
+
+    return None
+
+# Sets the OsuFile attributes of an event parsed by _parse_event, only the first background and video are used
+def _set_event(osu_file, *pairs):
+    if getattr(osu_file, pairs[-1][0]) == "":
+        for attribute, value in pairs:
+            setattr(osu_file, attribute, value)
+
+# Maps each row section to its OsuFile attribute, row parser and row type
+_ROW_SECTIONS = {
+    "TimingPoints": ("timing_points", _parse_timing_point, OsuTimingPoint),
+    "HitObjects": ("hit_objects", _parse_hit_object, OsuHitObject)
+}
+
+# Maps each OsuFile attribute that is read from a section to the name of that section
+_SECTION_ATTRIBUTES = {attribute: section for section, fields in _KEY_VALUE_SECTIONS.items() for attribute, _ in fields.values()}
+_SECTION_ATTRIBUTES.update({attribute: section for section, (attribute, _, _) in _ROW_SECTIONS.items()})
+_SECTION_ATTRIBUTES.update(dict.fromkeys(("background_filename", "video_filename", "video_offset"), "Events"))
+
+# Every section that a LazyOsuFile parses
+_LAZY_SECTIONS = (*_KEY_VALUE_SECTIONS, "Events", *_ROW_SECTIONS)
+
+# An OsuFile backed by a memory-mapped .osu file, created by Osu.create_from_path(fname, lazy=True)
+# The file is indexed one section header at a time, and every section is only parsed
+# when one of its attributes is first accessed, so reading e.g. the metadata of a marathon map
+# never touches the pages of its [Events], [TimingPoints] and [HitObjects] sections.
+# The map is closed once every section has been parsed.
+class LazyOsuFile(OsuFile):
+    def __init__(self, mapped_file, columnar=False):
+        self._mmap = mapped_file
+        self._columnar = columnar
+        self._sections = {}         # section name -> (start, end) offsets of its content
+        self._scan_position = 0     # offset the next section header is searched from, None once the whole file is indexed
+        self._open_section = None   # (name, start) of the last found section, its end is the next header
+        self._parsed = set()
+
+    def __getattr__(self, name):
+        # Only called for attributes that aren't set yet
+        section = _SECTION_ATTRIBUTES.get(name)
+        if section is None or self.__dict__.get("_mmap") is None:
+            raise AttributeError(name)
+
+        self._parse_section(section)
+        return self.__dict__[name]
+
+    # Returns the (start, end) offsets of a section, or None if the file doesn't have it
+    # Headers are only searched for up to the end of the requested section
+    def _section_bounds(self, section):
+        mapped_file = self._mmap
+
+        while section not in self._sections and self._scan_position is not None:
+            header_start = mapped_file.find(b"[", self._scan_position)
+
+            # A header has to be at the start of a line
+            while header_start > 0 and mapped_file[header_start - 1:header_start] != b"\n":
+                header_start = mapped_file.find(b"[", header_start + 1)
+
+            if header_start == -1:
+                header_start = len(mapped_file)
+                self._scan_position = None
+                header = None
+            else:
+                line_end = mapped_file.find(b"\n", header_start)
+                if line_end == -1:
+                    line_end = len(mapped_file)
+                self._scan_position = line_end
+
+                line = mapped_file[header_start:line_end].strip()
+                if line[-1:] != b"]":
+                    continue
+                header = line[1:-1].decode("utf-8")
+
+            if self._open_section is not None:
+                name, start = self._open_section
+                self._sections.setdefault(name, (start, header_start))
+
+            self._open_section = (header, self._scan_position) if header is not None else None
+
+        return self._sections.get(section)
+
+    # Parses a section into the OsuFile attributes, which are set to their defaults first
+    def _parse_section(self, section):
+        if section in self._parsed:
+            return
+        self._parsed.add(section)
+
+        defaults = OsuFile()
+        if section in _ROW_SECTIONS:
+            attribute, parse_row, row_type = _ROW_SECTIONS[section]
+            if self._columnar:
+                rows = OsuTimingPointColumns() if row_type is OsuTimingPoint else OsuHitObjectColumns()
+                append_row = rows.append_values
+            else:
+                rows = []
+                append_row = lambda *values: rows.append(row_type(*values))
+            setattr(self, attribute, rows)
+        elif section == "Events":
+            parse_row = _parse_event
+            append_row = lambda *pairs: _set_event(self, *pairs)
+            for attribute in ("background_filename", "video_filename", "video_offset"):
+                setattr(self, attribute, getattr(defaults, attribute))
+        else:
+            key_values = _KEY_VALUE_SECTIONS[section]
+            for attribute, _ in key_values.values():
+                setattr(self, attribute, getattr(defaults, attribute))
+
+        bounds = self._section_bounds(section)
+        if bounds is not None:
+            for line in self._mmap[bounds[0]:bounds[1]].decode("utf-8").splitlines():
+                line = line.strip()
+                if line == "" or line[:2] == "//":
+                    continue
+
+                if section in _ROW_SECTIONS or section == "Events":
+                    values = parse_row(line)
+                    if values is not None:
+                        append_row(*values)
+                else:
+                    key, _, value = line.partition(":")
+                    field = key_values.get(key.strip())
+                    if field is not None:
+                        setattr(self, field[0], field[1](value.strip()))
+
+        if section == "TimingPoints":
+            self._prepend_timing_point()
+
+        if len(self._parsed) == len(_LAZY_SECTIONS):
+            self.close()
+
+    # Same as Osu.create_from_lines, prepends an OsuTimingPoint for any hit objects before the first timing point
+    # Only the first [HitObjects] row is parsed for it if the hit objects aren't accessed yet
+    def _prepend_timing_point(self):
+        if "HitObjects" in self._parsed:
+            first_time = self.hit_objects[0].time if len(self.hit_objects) > 0 else None
+        else:
+            first_time = None
+            bounds = self._section_bounds("HitObjects")
+            position = bounds[0] if bounds is not None else None
+
+            while position is not None and position < bounds[1]:
+                line_end = self._mmap.find(b"\n", position, bounds[1])
+                line_end = line_end if line_end != -1 else bounds[1]
+                line = self._mmap[position:line_end].decode("utf-8").strip()
+                position = line_end + 1
+
+                if line != "" and line[:2] != "//":
+                    first_time = _parse_hit_object(line)[1]
+                    break
+
+        if first_time is not None and first_time < self.timing_points[0].time:
+            self.timing_points.insert(0, self.timing_points[0].moved_to(first_time))
+
+    # Parses every remaining section and closes the memory map
+    def load(self):
+        for section in _LAZY_SECTIONS:
+            if self.__dict__.get("_mmap") is not None:
+                self._parse_section(section)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    # Pickled (e.g. for the cache or a process pool) as a fully parsed OsuFile
+    def __getstate__(self):
+        self.load()
+        return {k: v for k, v in self.__dict__.items() if k[0] != "_"}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._mmap = None
+
 class Osu:
     # Create an OsuFile from a given path to a .osu file
-    # Returns an OsuFile, or None if the .osu file did not exist
+    # If headers_only is True, parsing stops after the [General], [Editor], [Metadata] and [Difficulty] sections
+    # If columnar is True, timing_points and hit_objects are stored as OsuTimingPointColumns and OsuHitObjectColumns
+    # If lazy is True, the file is memory-mapped and a LazyOsuFile is returned, which parses each section on first access
+    # Returns an OsuFile, or None if the .osu file did not exist or is not an osu!mania map
     @staticmethod
-    def create_from_path(fname):
+    def create_from_path(fname, headers_only=False, columnar=False, lazy=False):
         if exists(fname) and fname[-4:] == ".osu":
-            content = ""
-            with open(fname, "r+", encoding="utf-8") as file:
-                content = file.read()
-
-            # A .osu file is essentially a .ini file
-            cfg = ConfigParser(allow_no_value=True, delimiters=":", comment_prefixes="//", strict=False)
-            cfg.read_string("".join(content.split("\n", 2)[2:])) # start parsing on the [General] line to avoid MissingSectionHeaderError
-
-            osu_file = OsuFile()
-
-            # Check mode right away to ensure we're even dealing with an osu!mania map (mode must be 3)
-            osu_file.mode = cfg.getint("General", "Mode")
-            if osu_file.mode != 3:
-                print("Not a valid osu!mania map.")
-                return
-
-            # Get metadata information and key count
-            osu_file.audio_filename = cfg.get("General", "AudioFilename")
-            osu_file.audio_lead_in  = cfg.getint("General", "AudioLeadIn")
-            osu_file.preview_time   = cfg.getint("General", "PreviewTime")
-            osu_file.special_style  = cfg.getint("General", "SpecialStyle")
-
-            if cfg.has_option("Editor", "Bookmarks"):
-                osu_file.bookmarks = [int(x) for x in cfg.get("Editor", "Bookmarks").split(",")]
-
-            osu_file.title          = cfg.get("Metadata", "Title")
-            osu_file.title_unicode  = cfg.get("Metadata", "TitleUnicode")
-            osu_file.artist         = cfg.get("Metadata", "Artist")
-            osu_file.artist_unicode = cfg.get("Metadata", "ArtistUnicode")
-            osu_file.creator        = cfg.get("Metadata", "Creator")
-            osu_file.version        = cfg.get("Metadata", "Version")
-            osu_file.source         = cfg.get("Metadata", "Source")
-            osu_file.tags           = cfg.get("Metadata", "Tags")
-
-            osu_file.key_count          = cfg.getint("Difficulty", "CircleSize")
-            osu_file.overall_difficulty = cfg.getfloat("Difficulty", "OverallDifficulty")
-
-            # Taking advantage of ConfigParser's allow_no_value feature here
-            # to easily get lists of the map's TimingPoints and HitObjects
-            for t in cfg.items("TimingPoints"):
-                parsed_timing_point = t[0].split(",")
-
-                # Only append uninherited points (no SVs)
-                if parsed_timing_point[6] == "1":
-                    timing_point = OsuTimingPoint(
-                        # very rarely the editor will spit out floating point time values, so double cast to be safe
-                        time=int(float(parsed_timing_point[0])),
-                        beat_length=float(parsed_timing_point[1]),
-                        meter=int(parsed_timing_point[2]),
-                        sample_set=int(parsed_timing_point[3]),
-                        sample_index=int(parsed_timing_point[4]),
-                        volume=int(parsed_timing_point[5]),
-                        uninherited=("1" == parsed_timing_point[6]), # True if 1, False if 0
-                        effects=int(parsed_timing_point[7])
-                    )
-
-                    osu_file.timing_points.append(timing_point)
-
-            for h in cfg.items("HitObjects"):
-                parsed_hit_object = (h[0]+":"+h[1]).split(",") # add missing colon before comma split
-                x = int(parsed_hit_object[0])
-                time = int(parsed_hit_object[2])
-                type = int(parsed_hit_object[3])
-                end_time = 0
-
-                # osu!mania hold notes are formatted with an extra field
-                # for the end_time of the note which doesn't exist otherwise
-                if type & 128:
-                    end_time = int(parsed_hit_object[5].split(":")[0])
-
-                mania_hit_object = OsuHitObject(x, time, type, end_time)
-
-                osu_file.hit_objects.append(mania_hit_object)
-
-            # Prepend an OsuTimingPoint for any hit objects that maybe have
-            # been placed before the first real OsuTimingPoint
-            if len(osu_file.hit_objects) > 0:
-                if osu_file.hit_objects[0].time < osu_file.timing_points[0].time:
-                    osu_file.timing_points.insert(0, copy.copy(osu_file.timing_points[0]))
-                    osu_file.timing_points[0].time = osu_file.hit_objects[0].time
-
-            return osu_file
+            if lazy and os.path.getsize(fname) > 0:
+                return Osu.create_lazy(fname, columnar)
+
+            with open(fname, "r", encoding="utf-8") as file:
+                return Osu.create_from_lines(file, headers_only, columnar)
         else:
-            return None
\ No newline at end of file
+            return None
+
+    # Create a LazyOsuFile from a given path to a .osu file, only the [General] section is parsed right away
+    # Returns a LazyOsuFile, or None if the .osu file is not an osu!mania map
+    @staticmethod
+    def create_lazy(fname, columnar=False):
+        # Only imported here, most callers never memory-map a file
+        import mmap
+
+        with open(fname, "rb") as file:
+            osu_file = LazyOsuFile(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ), columnar)
+
+        if osu_file.mode != 3:
+            osu_file.close()
+            return None
+
+        return osu_file
+
+    # Create an OsuFile from an iterable of lines of a .osu file (e.g. an open file)
+    # The lines are parsed in a single pass, section by section, without keeping them in memory
+    # Returns an OsuFile, or None if the lines are not from an osu!mania map
+    @staticmethod
+    def create_from_lines(lines, headers_only=False, columnar=False):
+        osu_file = OsuFile()
+
+        if columnar:
+            osu_file.timing_points = OsuTimingPointColumns()
+            osu_file.hit_objects = OsuHitObjectColumns()
+
+        key_values = None
+        parse_row = None
+        append_row = None
+
+        for line in lines:
+            line = line.strip()
+
+            # Skip blank lines, comments, and the "osu file format" header
+            if line == "" or line[:2] == "//":
+                continue
+
+            if line[0] == "[" and line[-1] == "]":
+                section = line[1:-1]
+
+                # Check mode right after [General] to ensure we're even dealing with an osu!mania map (mode must be 3)
+                if osu_file.mode != 3 and key_values is _KEY_VALUE_SECTIONS["General"]:
+                    break
+
+                key_values = _KEY_VALUE_SECTIONS.get(section)
+                parse_row = None
+
+                if headers_only and key_values is None:
+                    break
+
+                if section in _ROW_SECTIONS:
+                    attribute, parse_row, row_type = _ROW_SECTIONS[section]
+                    rows = getattr(osu_file, attribute)
+                    if columnar:
+                        append_row = rows.append_values
+                    else:
+                        append_row = lambda *values, rows=rows, row_type=row_type: rows.append(row_type(*values))
+                elif section == "Events":
+                    parse_row = _parse_event
+                    append_row = lambda *pairs: _set_event(osu_file, *pairs)
+
+                continue
+
+            if parse_row is not None:
+                values = parse_row(line)
+                if values is not None:
+                    append_row(*values)
+            elif key_values is not None:
+                key, _, value = line.partition(":")
+                field = key_values.get(key.strip())
+                if field is not None:
+                    setattr(osu_file, field[0], field[1](value.strip()))
+
+        if osu_file.mode != 3:
+            return None
+
+        # Prepend an OsuTimingPoint for any hit objects that maybe have
+        # been placed before the first real OsuTimingPoint
+        if len(osu_file.hit_objects) > 0:
+            if osu_file.hit_objects[0].time < osu_file.timing_points[0].time:
+                osu_file.timing_points.insert(0, osu_file.timing_points[0].moved_to(osu_file.hit_objects[0].time))
+
+        return osu_file
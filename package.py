@@ -0,0 +1,104 @@
+"""
+package.py
+
+Exports a complete Clone Hero song folder: notes.chart, song.ini, and the audio, background and video of the map.
+The media is copied on a thread pool while the chart is being generated.
+"""
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from os.path import exists, join, splitext
+
+# Returns a list of (source path, file name in the song folder) of the media files of a map that exist in osu_dir
+# Clone Hero finds the audio, background and video of a song by these file names
+def media_files(osu_file, osu_dir, include_background=True):
+    media = [(osu_file.audio_filename, "song")]
+    if include_background:
+        media.append((osu_file.background_filename, "background"))
+        media.append((osu_file.video_filename, "video"))
+
+    return [(join(osu_dir, f), name + splitext(f)[1].lower()) for f, name in media if f != "" and exists(join(osu_dir, f))]
+
+# Copies the file src to dst, replacing dst if it exists
+# If link is True, dst is made a hardlink to src instead when both are on the same filesystem.
+# Otherwise shutil.copyfile is used, which copies with os.sendfile on Linux and fcopyfile on macOS
+def copy_file(src, dst, link=False):
+    if exists(dst):
+        if os.path.samefile(src, dst):
+            return
+        os.remove(dst)
+
+    if link:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            # Different filesystems, or a filesystem without hardlinks
+            pass
+
+    shutil.copyfile(src, dst)
+
+"""
+[song]
+name = ...
+artist = ...
+...
+"""
+# Writes the song.ini of a ChartFile to fname
+# osu_file is the source OsuFile of the chart, used for the fields that are not in the [Song] section
+def write_song_ini(chart_file, osu_file, fname):
+    song = chart_file.song
+
+    song_ini = {
+        "name": song["Name"],
+        "artist": song["Artist"],
+        "charter": song["Charter"],
+        "genre": song["Genre"],
+        "diff_guitar": song["Difficulty"],
+        "preview_start_time": round(song["PreviewStart"] * 1000)
+    }
+
+    # osu! delays the video by its offset, Clone Hero skips into the video by video_start_time
+    if osu_file.video_filename != "":
+        song_ini["video_start_time"] = -osu_file.video_offset
+
+    with open(fname, "w", encoding="utf-8") as file:
+        file.write("[song]\n")
+        for k in song_ini:
+            file.write(f"{k} = {song_ini[k]}\n")
+
+# Writes a Clone Hero song folder to out_dir for the beatmap set in osu_dir
+# create_chart is a function that returns the ChartFile, it is called while the media is being copied
+# source_osu_file is the OsuFile that create_chart uses as its source, its audio, background and video are copied
+# Returns the ChartFile
+def export_package(create_chart, source_osu_file, osu_dir, out_dir, include_background=True, link=False, executor=None):
+    os.makedirs(out_dir, exist_ok=True)
+
+    media = media_files(source_osu_file, osu_dir, include_background)
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max(1, len(media)))
+
+    try:
+        copies = [executor.submit(copy_file, src, join(out_dir, name), link) for src, name in media]
+
+        chart_file = create_chart()
+
+        # The audio is renamed in the song folder
+        audio = next((name for _, name in media if name[:5] == "song."), None)
+        if audio is not None:
+            chart_file.song["GuitarStream"] = audio
+
+        chart_file.export(join(out_dir, "notes.chart"))
+        write_song_ini(chart_file, source_osu_file, join(out_dir, "song.ini"))
+
+        # Raise any error from copying
+        for copy in copies:
+            copy.result()
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return chart_file
@@ -0,0 +1,100 @@
+"""
+profiling.py
+
+Opt-in instrumentation of the conversion pipeline. A StageProfiler records the wall time,
+CPU time, object counts and (optionally) allocations of every stage of a conversion:
+parsing each .osu file, generating the SyncTrack and note tracks, and exporting the chart.
+"""
+
+import time
+from contextlib import contextmanager
+
+from osu import Osu
+
+class StageProfiler:
+    def __init__(self, trace_allocations=False):
+        self.trace_allocations = trace_allocations
+        self.records = []
+        self._observers = []
+
+    # Adds a callback that is called with the record of every stage once it finishes
+    def add_observer(self, callback):
+        self._observers.append(callback)
+
+    # Context manager that records a stage of the conversion of fname
+    # Yields the record (a dict), so the stage can add its own counts to it, e.g. record["hit_objects"] = ...
+    @contextmanager
+    def stage(self, stage, fname=""):
+        record = {"file": fname, "stage": stage}
+
+        started_tracing = False
+        if self.trace_allocations:
+            # tracemalloc and json are imported when first used, so importing this module stays cheap
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            start_allocated = tracemalloc.get_traced_memory()[0]
+
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+
+        try:
+            yield record
+        finally:
+            record["wall_seconds"] = time.perf_counter() - start_wall
+            record["cpu_seconds"] = time.process_time() - start_cpu
+
+            if self.trace_allocations:
+                allocated, peak = tracemalloc.get_traced_memory()
+                record["allocated_bytes"] = allocated - start_allocated
+                record["peak_bytes"] = peak - start_allocated
+                if started_tracing:
+                    tracemalloc.stop()
+
+            self.add_record(record)
+
+    # Adds a finished record, e.g. one that was recorded in another process
+    def add_record(self, record):
+        self.records.append(record)
+
+        for callback in self._observers:
+            callback(record)
+
+    # Returns the total wall time, CPU time and number of records of every stage name
+    def summary(self):
+        totals = {}
+        for record in self.records:
+            # Note track stages are named per difficulty, e.g. "note_tracks:Expert"
+            stage = record["stage"].split(":")[0]
+            total = totals.setdefault(stage, {"count": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+            total["count"] += 1
+            total["wall_seconds"] += record["wall_seconds"]
+            total["cpu_seconds"] += record["cpu_seconds"]
+
+        return totals
+
+    def dump_json(self, fname):
+        import json
+
+        with open(fname, "w", encoding="utf-8") as file:
+            json.dump({"summary": self.summary(), "records": self.records}, file, indent=2)
+
+# Osu.create_from_path wrapped in a "parse" stage, for use in worker processes
+# Returns (OsuFile, [record]) so the record can be added to the profiler of the main process
+def create_from_path_profiled(fname, trace_allocations=False, **kwargs):
+    profiler = StageProfiler(trace_allocations)
+
+    with profiler.stage("parse", fname) as record:
+        osu_file = Osu.create_from_path(fname, **kwargs)
+        if osu_file is not None:
+            record["hit_objects"] = len(osu_file.hit_objects)
+            record["timing_points"] = len(osu_file.timing_points)
+
+    return osu_file, profiler.records
+
+# Returns True if a --profile file name should be written as a cProfile/pstats file rather than JSON
+def is_pstats_fname(fname):
+    return fname.endswith(".pstats") or fname.endswith(".prof")
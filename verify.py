@@ -0,0 +1,210 @@
+"""
+verify.py
+
+Checks a converted chart against the .osu files it was converted from. Every note is converted back
+to milliseconds through the chart's [SyncTrack] and compared with the hit object it was converted from,
+and notes that are off the beat grid or drifted from their hit object are reported per difficulty.
+
+Usage: python verify.py <notes.chart> --expert <.osu> [--hard <.osu>] [--medium <.osu>] [--easy <.osu>] [--tolerance MS]
+"""
+
+import argparse
+import sys
+from bisect import bisect_right
+from itertools import accumulate
+
+from osu import Osu, hit_object_columns
+from chart import Chart, SyncTrackBPM, _TRACK_OBJECT_KINDS, _column_to_note, x_to_key_column
+
+DIFFICULTIES = ("Expert", "Hard", "Medium", "Easy")
+
+# Notes per beat that are on the grid: 1/4, 1/8, 1/16, 1/32 and 1/64 notes, and 1/12, 1/24 and 1/48 triplets
+GRID_DIVISORS = (1, 2, 3, 4, 6, 8, 12, 16)
+
+# Maps chart ticks back to milliseconds through the BPM changes of a [SyncTrack]
+class TempoMap:
+    def __init__(self, sync_track, offset=0):
+        sync_track.finalise()
+        self.resolution = sync_track.resolution
+
+        bpm_kind = _TRACK_OBJECT_KINDS[SyncTrackBPM]
+        bpm_changes = [(tick, value) for tick, kind, value in zip(sync_track.ticks, sync_track.kinds, sync_track.values) if kind == bpm_kind]
+        self.ticks = [tick for tick, _ in bpm_changes]
+        self.bpms = [value / 1000 for _, value in bpm_changes]
+
+        # Milliseconds of a tick at every BPM change, and the time of every BPM change from the chart's offset (in seconds)
+        self.tick_lengths = [60000 / (bpm * self.resolution) for bpm in self.bpms]
+        offsets = [(self.ticks[b] - self.ticks[b - 1]) * self.tick_lengths[b - 1] for b in range(1, len(self.ticks))]
+        self.times = list(accumulate(offsets, initial=offset * 1000))
+
+    # Returns the index of the BPM change that a tick belongs to
+    def tempo_index(self, tick):
+        return max(bisect_right(self.ticks, tick) - 1, 0)
+
+    # Returns the time in milliseconds of a tick, optionally on a known BPM change
+    def time(self, tick, b=None):
+        if b is None:
+            b = self.tempo_index(tick)
+
+        return self.times[b] + (tick - self.ticks[b]) * self.tick_lengths[b]
+
+# Returns the set of tick offsets within a beat that are on the grid of GRID_DIVISORS
+def grid_offsets(resolution):
+    return {k * resolution // d for d in GRID_DIVISORS for k in range(d) if k * resolution % d == 0}
+
+# Returns a dict of lane -> [(time, end_time)] for the hit objects of an OsuFile, sorted by time,
+# where a lane is the (player, track object kind, note value) that a column is converted to
+def _osu_lanes(osu_file):
+    xs, times, _, end_times = hit_object_columns(osu_file.hit_objects)
+
+    x_lanes = {}
+    for x in set(xs):
+        player, track_object_type, note_value = _column_to_note(x_to_key_column(x, osu_file.key_count), osu_file.key_count)
+        x_lanes[x] = (player, _TRACK_OBJECT_KINDS[track_object_type], note_value)
+
+    lanes = {}
+    for x, time, end_time in zip(xs, times, end_times):
+        lanes.setdefault(x_lanes[x], []).append((time, end_time))
+
+    for notes in lanes.values():
+        notes.sort()
+
+    return lanes
+
+# Returns a dict of lane -> [(tick, length)] for the note tracks of a difficulty, see _osu_lanes
+def _chart_lanes(note_tracks):
+    lanes = {}
+    for player, note_track in enumerate(note_tracks):
+        note_track.finalise()
+        for tick, kind, value, length in zip(note_track.ticks, note_track.kinds, note_track.values, note_track.lengths):
+            lanes.setdefault((player, kind, value), []).append((tick, length))
+
+    return lanes
+
+# Compares the note tracks of one difficulty with the OsuFile they were converted from
+#
+# A note is off-grid when it isn't on any GRID_DIVISORS snap counted from its BPM change, and drifted when its
+# time differs from its hit object by more than one tick (the most that quantizing to every second tick moves it)
+# plus tolerance milliseconds. A BPM change itself can be up to half a tick of the BPM before it away from its timing point,
+# which after a large tempo change is several ticks of the new BPM, so that is allowed for as well.
+# Sustain ends are checked for drift the same way.
+# Returns a dict with the number of notes, unmatched (missing or extra) notes, off-grid notes, drifted notes
+# and sustain ends, the largest error in milliseconds, and the times of the first few off-grid and drifted notes
+def verify_difficulty(tempo_map, note_tracks, osu_file, tolerance=1.0, examples=10):
+    resolution = tempo_map.resolution
+    on_grid = grid_offsets(resolution)
+    tempo_ticks, tempo_times, tick_lengths = tempo_map.ticks, tempo_map.times, tempo_map.tick_lengths
+
+    # Milliseconds a BPM change can be placed away from its timing point, see above
+    anchor_errors = [0.0] + [tick_length / 2 for tick_length in tick_lengths[:-1]]
+
+    unmatched = off_grid = drifted = drifted_sustains = 0
+    max_error = 0.0
+    off_grid_times = []
+    drifted_times = []
+
+    osu_lanes = _osu_lanes(osu_file)
+    chart_lanes = _chart_lanes(note_tracks)
+
+    for lane in osu_lanes.keys() | chart_lanes.keys():
+        osu_notes = osu_lanes.get(lane, [])
+        chart_notes = chart_lanes.get(lane, [])
+        unmatched += abs(len(osu_notes) - len(chart_notes))
+
+        for (time, end_time), (tick, length) in zip(osu_notes, chart_notes):
+            b = max(bisect_right(tempo_ticks, tick) - 1, 0)
+
+            if (tick - tempo_ticks[b]) % resolution not in on_grid:
+                off_grid += 1
+                if len(off_grid_times) < examples:
+                    off_grid_times.append(time)
+
+            error = abs(tempo_times[b] + (tick - tempo_ticks[b]) * tick_lengths[b] - time)
+            if error > max_error:
+                max_error = error
+            if error > tick_lengths[b] + anchor_errors[b] + tolerance:
+                drifted += 1
+                if len(drifted_times) < examples:
+                    drifted_times.append(time)
+
+            if length > 0 and end_time > 0:
+                end_tick = tick + length
+                end_b = tempo_map.tempo_index(end_tick)
+                if abs(tempo_map.time(end_tick, end_b) - end_time) > 2 * tick_lengths[end_b] + anchor_errors[end_b] + tolerance:
+                    drifted_sustains += 1
+
+    return {
+        "notes": len(osu_file.hit_objects),
+        "unmatched": unmatched,
+        "off_grid": off_grid,
+        "drifted": drifted,
+        "drifted_sustains": drifted_sustains,
+        "max_error_ms": max_error,
+        "off_grid_times": off_grid_times,
+        "drifted_times": drifted_times
+    }
+
+# Compares every difficulty of a ChartFile with the OsuFiles it was converted from
+# osu_files is a dict of difficulty name (e.g. "Expert") -> OsuFile, difficulties that are None are skipped
+# Returns a dict of difficulty name -> report, see verify_difficulty
+def verify_chart(chart_file, osu_files, tolerance=1.0):
+    tempo_map = TempoMap(chart_file.sync_track, chart_file.song["Offset"])
+
+    reports = {}
+    for difficulty, osu_file in osu_files.items():
+        if osu_file is None:
+            continue
+
+        note_tracks = [t for t in chart_file.note_tracks if t.name in (f"{difficulty}Single", f"{difficulty}DoubleGuitar")]
+        note_tracks.sort(key=lambda t: t.name != f"{difficulty}Single")
+        reports[difficulty] = verify_difficulty(tempo_map, note_tracks, osu_file, tolerance)
+
+    return reports
+
+# Returns a one line summary of the problems in a verify_chart result, or None if there are none
+def summarize(reports):
+    problems = []
+    for difficulty, report in reports.items():
+        counts = [f"{report[k]} {k.replace('_', '-')}" for k in ("unmatched", "off_grid", "drifted", "drifted_sustains") if report[k] > 0]
+        if len(counts) > 0:
+            problems.append(f"{difficulty} {', '.join(counts)}")
+
+    return "; ".join(problems) if len(problems) > 0 else None
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Check a converted chart against the .osu files it was converted from.")
+    parser.add_argument("chart", help="notes.chart file")
+    for difficulty in DIFFICULTIES:
+        parser.add_argument(f"--{difficulty.lower()}", metavar="OSU", help=f"{difficulty} .osu file")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="milliseconds of drift allowed on top of one tick (default: 1)")
+
+    args = parser.parse_args(argv)
+
+    if all(getattr(args, d.lower()) is None for d in DIFFICULTIES):
+        parser.error("at least one difficulty is required")
+
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    chart_file = Chart.create_from_path(args.chart)
+    if chart_file is None:
+        print(f"Could not read {args.chart}")
+        return 1
+
+    osu_files = {d: Osu.create_from_path(getattr(args, d.lower()), columnar=True) for d in DIFFICULTIES if getattr(args, d.lower()) is not None}
+    reports = verify_chart(chart_file, osu_files, args.tolerance)
+
+    for difficulty, report in reports.items():
+        print(f"{difficulty}: {report['notes']} notes, {report['unmatched']} unmatched, {report['off_grid']} off-grid, "
+              f"{report['drifted']} drifted, {report['drifted_sustains']} drifted sustains, max error {report['max_error_ms']:.2f} ms")
+        if len(report["off_grid_times"]) > 0:
+            print(f"  off-grid at {', '.join(str(t) for t in sorted(report['off_grid_times']))} ms")
+        if len(report["drifted_times"]) > 0:
+            print(f"  drifted at {', '.join(str(t) for t in sorted(report['drifted_times']))} ms")
+
+    return 1 if any(r["unmatched"] > 0 or r["drifted"] > 0 for r in reports.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+watch.py
+
+Watches up to four .osu difficulties and rewrites notes.chart whenever one of them is saved,
+so a map can be edited in osu! and play-tested in Clone Hero without converting by hand.
+
+Usage: python watch.py <save directory> --expert <.osu> [--hard <.osu>] [--medium <.osu>] [--easy <.osu>] [options]
+"""
+
+import argparse
+import os
+import sys
+import time
+from os.path import join
+
+from osu import Osu
+from chart import ChartFile, create_tick_index, _generate_note_tracks, _generate_song, _generate_sync_track
+
+# Same order as the GUI, the first difficulty that exists provides the metadata and SyncTrack
+DIFFICULTIES = ("Easy", "Medium", "Hard", "Expert")
+
+# Returns a (modification time, size) pair that changes whenever a file is saved, or None if it doesn't exist
+def file_signature(fname):
+    try:
+        stat = os.stat(fname)
+    except OSError:
+        return None
+
+    return (stat.st_mtime_ns, stat.st_size)
+
+# Keeps the parsed OsuFile and generated tracks of every difficulty,
+# so a change to one .osu file only regenerates the tracks of that difficulty
+class ChartSession:
+    def __init__(self, paths, resolution=96, preview_length=0, use_unicode_metadata=False, use_tags_as_genre=False, exact_timing=False, snap=None):
+        self.paths = paths # difficulty -> .osu path
+        self.resolution = resolution
+        self.exact_timing = exact_timing
+        self.snap = snap
+        self.preview_length = preview_length
+        self.use_unicode_metadata = use_unicode_metadata
+        self.use_tags_as_genre = use_tags_as_genre
+
+        self.osu_files = dict.fromkeys(paths)
+        self.note_tracks = {difficulty: [] for difficulty in paths}
+        self.source = None
+        self.sync_track = None
+
+    # Re-parses a difficulty and regenerates its note tracks, and the SyncTrack if it is the source difficulty
+    # Returns False if the .osu file could not be converted, in which case the previous tracks are kept
+    def update(self, difficulty):
+        try:
+            osu_file = Osu.create_from_path(self.paths[difficulty], columnar=True)
+
+            # A save cut off before [TimingPoints] still parses, but can't be converted
+            if osu_file is not None and len(osu_file.timing_points) == 0:
+                raise ValueError("no timing points")
+
+            tick_index = None
+            note_tracks = []
+            if osu_file is not None:
+                tick_index = create_tick_index(osu_file.timing_points, self.resolution, self.exact_timing, self.snap)
+                note_tracks = _generate_note_tracks(difficulty, osu_file.timing_points, osu_file.hit_objects, osu_file.key_count, self.resolution, tick_index)
+        except Exception as e:
+            # Most likely a save that is still being written, it is converted again on the next save
+            print(f"Could not convert {self.paths[difficulty]}: {e!r}")
+            return False
+
+        self.osu_files[difficulty] = osu_file
+        self.note_tracks[difficulty] = note_tracks
+
+        source = next((d for d in DIFFICULTIES if self.osu_files.get(d) is not None), None)
+        if source == difficulty or source != self.source:
+            self.source = source
+            self.sync_track = None
+            if source is not None:
+                source_osu_file = self.osu_files[source]
+                if source != difficulty:
+                    tick_index = create_tick_index(source_osu_file.timing_points, self.resolution, self.exact_timing, self.snap)
+                self.sync_track = _generate_sync_track(source_osu_file.timing_points, self.resolution, tick_index)
+
+        return True
+
+    # Returns a ChartFile assembled from the current tracks, or None if no difficulty could be converted
+    def create_chart(self):
+        if self.source is None:
+            return None
+
+        chart_file = ChartFile()
+        _generate_song(chart_file, self.osu_files[self.source], self.resolution, self.preview_length, self.use_unicode_metadata, self.use_tags_as_genre)
+        chart_file.sync_track = self.sync_track
+
+        for difficulty in reversed(DIFFICULTIES):
+            chart_file.note_tracks.extend(self.note_tracks.get(difficulty, []))
+
+        return chart_file
+
+# Exports a ChartFile to fname through a temporary file, so Clone Hero never reads a partially written chart
+def export_atomically(chart_file, fname):
+    temp_fname = f"{fname}.tmp"
+    chart_file.export(temp_fname)
+    os.replace(temp_fname, fname)
+
+def watch(session, chart_fname, interval=0.1):
+    signatures = {difficulty: file_signature(path) for difficulty, path in session.paths.items()}
+
+    for difficulty in session.paths:
+        session.update(difficulty)
+
+    chart_file = session.create_chart()
+    if chart_file is None:
+        print("Failed to convert! Please check the path(s) to your .osu file(s).")
+    else:
+        export_atomically(chart_file, chart_fname)
+        print(f"Wrote {chart_fname}")
+
+    print("Watching for changes, press Ctrl+C to stop.")
+
+    while True:
+        time.sleep(interval)
+
+        changed = [d for d, path in session.paths.items() if file_signature(path) != signatures[d]]
+        if len(changed) == 0:
+            continue
+
+        # Wait for the editor to finish writing before parsing
+        time.sleep(interval)
+        for difficulty in changed:
+            signatures[difficulty] = file_signature(session.paths[difficulty])
+
+        start = time.perf_counter()
+        updated = [d for d in changed if session.update(d)]
+        if len(updated) == 0:
+            continue
+
+        chart_file = session.create_chart()
+        if chart_file is None:
+            print(f"{', '.join(updated)} changed, but no difficulty could be converted.")
+            continue
+
+        export_atomically(chart_file, chart_fname)
+
+        # Save-to-playable latency is measured from the modification time of the saved file
+        conversion = time.perf_counter() - start
+        saved_times = [signatures[d][0] / 1e9 for d in updated if signatures[d] is not None]
+        latency = time.time() - max(saved_times) if len(saved_times) > 0 else conversion
+        print(f"{', '.join(updated)} changed: converted in {conversion * 1000:.0f} ms, playable {latency * 1000:.0f} ms after save")
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Watch osu!mania difficulties and rewrite notes.chart whenever one is saved.")
+    parser.add_argument("save_dir", help="directory to write notes.chart to")
+    for difficulty in reversed(DIFFICULTIES):
+        parser.add_argument(f"--{difficulty.lower()}", metavar="OSU", help=f"{difficulty} .osu file")
+    parser.add_argument("-r", "--resolution", type=int, default=96, help="chart resolution (default: 96)")
+    parser.add_argument("-p", "--preview-length", type=float, default=0.0, help="preview length in seconds (default: 0)")
+    parser.add_argument("--exact-timing", action="store_true", help="place every note from the tick of its own timing point, so rounding errors stay within each timing point instead of adding up over long maps (see README)")
+    parser.add_argument("--snap", type=int, metavar="N", help="snap notes to 1/N notes from their timing point, e.g. 192 (requires --exact-timing, default: every 2 ticks)")
+    parser.add_argument("--unicode", action="store_true", help="use unicode metadata")
+    parser.add_argument("--tags-as-genre", action="store_true", help="use tags as genre")
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between checks for changes (default: 0.1)")
+
+    args = parser.parse_args(argv)
+
+    if all(getattr(args, d.lower()) is None for d in DIFFICULTIES):
+        parser.error("at least one difficulty is required")
+    if args.resolution <= 0:
+        parser.error("--resolution must be greater than 0")
+    if args.preview_length < 0:
+        parser.error("--preview-length cannot be a negative number")
+    if args.snap is not None and not args.exact_timing:
+        parser.error("--snap requires --exact-timing")
+    if args.snap is not None and args.snap <= 0:
+        parser.error("--snap must be greater than 0")
+
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    paths = {d: getattr(args, d.lower()) for d in DIFFICULTIES if getattr(args, d.lower()) is not None}
+    session = ChartSession(paths, args.resolution, args.preview_length, args.unicode, args.tags_as_genre, args.exact_timing, args.snap)
+
+    try:
+        watch(session, join(args.save_dir, "notes.chart"), args.interval)
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())